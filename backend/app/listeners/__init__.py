@@ -1,15 +1,22 @@
 import asyncio
 import logging
-from typing import Dict, Set
+import os
+import time
+from typing import Dict, List, Set
 from .btc_listener import BTCListener
 from .ln_listener import LightningListener
 from .usdc_listener import USDCListener
-from ..services.invoice_service import InvoiceService
+from ..services.expiry_scheduler import expiry_scheduler
+from ..services.invoice_service import InvoiceService, StatusEvent
+from ..services.status_writer import status_writer
 from ..services.webhook_service import WebhookService
 from ..database import AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
 
+# Seconds between full sweeps for overdue invoices the expiry scheduler did not track
+EXPIRY_SWEEP_INTERVAL = float(os.getenv("EXPIRY_SWEEP_INTERVAL", "300"))
+
 class BlockchainListenerManager:
     """Manages all blockchain listeners"""
 
@@ -21,6 +28,9 @@ class BlockchainListenerManager:
         }
         self.active_invoices: Dict[str, str] = {}  # invoice_id -> address_or_pr
         self.running = False
+        self._tasks: List[asyncio.Task] = []
+        # Tasks waiting for queued status events to commit, kept so they are not garbage collected
+        self._pending_writes: Set[asyncio.Task] = set()
 
     async def start(self):
         """Start all blockchain listeners"""
@@ -40,9 +50,23 @@ class BlockchainListenerManager:
         monitor_task = asyncio.create_task(self._monitor_invoices())
         tasks.append(monitor_task)
 
-        # Wait for all tasks (they run indefinitely)
+        self._tasks = tasks
+
+        # Wait for all tasks (they run until stop())
         await asyncio.gather(*tasks, return_exceptions=True)
 
+    async def stop(self):
+        """Stop all listeners, so no more payments are submitted to the status writer"""
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def wait_for_webhooks(self):
+        """Wait for the webhooks of payments already submitted; call after the status writer drains"""
+        await asyncio.gather(*self._pending_writes, return_exceptions=True)
+
     async def _run_listener(self, name: str, listener):
         """Run a specific blockchain listener"""
         while self.running:
@@ -53,11 +77,19 @@ class BlockchainListenerManager:
                 await asyncio.sleep(5)  # Wait before retrying
 
     async def _monitor_invoices(self):
-        """Monitor active invoices and update listeners"""
+        """Monitor active invoices and update listeners
+
+        Invoices are expired on time by the expiry scheduler; the slower sweep
+        only catches invoices it was never told about.
+        """
+        expiry_scheduler.add_callback(self._forget_invoices)
+        last_sweep = 0.0
         while self.running:
             try:
                 await self._update_active_invoices()
-                await self._check_expired_invoices()
+                if time.monotonic() - last_sweep >= EXPIRY_SWEEP_INTERVAL:
+                    await self._check_expired_invoices()
+                    last_sweep = time.monotonic()
                 await asyncio.sleep(30)  # Check every 30 seconds
             except Exception as e:
                 logger.error(f"Invoice monitoring failed: {str(e)}")
@@ -66,76 +98,63 @@ class BlockchainListenerManager:
     async def _update_active_invoices(self):
         """Update listeners with active invoice addresses"""
         async with AsyncSessionLocal() as session:
-            expired_ids = await InvoiceService.check_expired_invoices(session)
-
             # Get all pending invoices
-            from sqlalchemy import select
-            from ..models.models import Invoice
-
-            result = await session.execute(
-                select(Invoice.id, Invoice.address_or_pr, Invoice.method)
-                .where(Invoice.status == "pending")
-            )
-
             active_invoices = {}
-            for row in result.all():
-                invoice_id, address_or_pr, method = row
-                active_invoices[invoice_id] = address_or_pr
+            for row in await InvoiceService.list_pending_invoices(session):
+                active_invoices[row.id] = row.address_or_pr
 
                 # Update listeners based on method
-                if method == "BTC":
-                    self.listeners["btc"].add_address(address_or_pr)
-                elif method == "BTC_LN":
-                    self.listeners["ln"].add_invoice(address_or_pr)
-                elif method == "USDC_BASE":
-                    self.listeners["usdc"].add_address(address_or_pr)
+                if row.method == "BTC":
+                    self.listeners["btc"].add_address(row.address_or_pr)
+                elif row.method == "BTC_LN":
+                    self.listeners["ln"].add_invoice(row.address_or_pr)
+                elif row.method == "USDC_BASE":
+                    self.listeners["usdc"].add_address(row.address_or_pr)
 
             self.active_invoices = active_invoices
 
-            # Remove expired invoices from listeners
-            for expired_id in expired_ids:
-                if expired_id in self.active_invoices:
-                    address_or_pr = self.active_invoices[expired_id]
-                    # Remove from appropriate listener
-                    for listener in self.listeners.values():
-                        listener.remove_address(address_or_pr)
-
     async def _check_expired_invoices(self):
-        """Check for expired invoices and clean up listeners"""
+        """Expire overdue invoices the scheduler missed and clean up listeners"""
         async with AsyncSessionLocal() as session:
             expired_ids = await InvoiceService.check_expired_invoices(session)
+            await session.commit()
+        self._forget_invoices(expired_ids)
 
-            for expired_id in expired_ids:
-                if expired_id in self.active_invoices:
-                    address_or_pr = self.active_invoices[expired_id]
-                    # Remove from listeners
-                    for listener in self.listeners.values():
-                        listener.remove_address(address_or_pr)
-                    del self.active_invoices[expired_id]
+    def _forget_invoices(self, invoice_ids: List[str]):
+        """Stop monitoring the addresses of expired invoices"""
+        for invoice_id in invoice_ids:
+            address_or_pr = self.active_invoices.pop(invoice_id, None)
+            if address_or_pr is not None:
+                for listener in self.listeners.values():
+                    listener.remove_address(address_or_pr)
 
     async def _on_payment_detected(self, invoice_id: str, tx_hash: str, amount_received: str, confirmations: int = 0):
         """Handle payment detection"""
         logger.info(f"Payment detected for invoice {invoice_id}: {tx_hash}")
 
-        async with AsyncSessionLocal() as session:
-            # Update invoice status
-            if confirmations >= 1:
-                status = "confirmed"
-            else:
-                status = "detected"
-
-            success = await InvoiceService.update_invoice_status(
-                db=session,
-                invoice_id=invoice_id,
-                status=status,
-                tx_hash=tx_hash,
-                amount_received=amount_received,
-                confirmations=confirmations
-            )
-
-            if success:
+        # Update invoice status
+        if confirmations >= 1:
+            status = "confirmed"
+        else:
+            status = "detected"
+
+        # Queued for the next group commit, so the listener can go on reading payments
+        written = await status_writer.submit(StatusEvent(invoice_id, status, tx_hash, amount_received, confirmations))
+        task = asyncio.create_task(self._after_status_written(written, invoice_id, status, tx_hash, amount_received))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    async def _after_status_written(
+        self, written: "asyncio.Future[bool]", invoice_id: str, status: str, tx_hash: str, amount_received: str
+    ):
+        """Send the payment webhook once the status change is committed"""
+        try:
+            # Re-reported transactions change nothing and must not notify again
+            if await written:
                 # Send webhook notification
                 await self._send_payment_webhook(invoice_id, status, tx_hash, amount_received)
+        except Exception as e:
+            logger.error(f"Failed to record payment for invoice {invoice_id}: {str(e)}")
 
     async def _send_payment_webhook(self, invoice_id: str, status: str, tx_hash: str, amount_received: str):
         """Send webhook notification for payment"""
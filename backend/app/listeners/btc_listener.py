@@ -1,8 +1,8 @@
 import asyncio
-import httpx
 import logging
 from typing import Callable, Awaitable, Dict
 from .base_listener import BlockchainListener
+from ..services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -31,9 +31,8 @@ class BTCListener(BlockchainListener):
         for address in self.monitored_addresses.copy():
             try:
                 # Get address transactions
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(f"{self.BLOCKSTREAM_API}/address/{address}/txs")
-                    transactions = response.json()
+                response = await http_clients.get("blockstream").get(f"{self.BLOCKSTREAM_API}/address/{address}/txs")
+                transactions = response.json()
 
                 # Check recent transactions (last 10)
                 for tx in transactions[:10]:
@@ -55,10 +54,9 @@ class BTCListener(BlockchainListener):
                 if confirmations:
                     # Get confirmation count
                     try:
-                        async with httpx.AsyncClient() as client:
-                            response = await client.get(f"{self.BLOCKSTREAM_API}/tx/{tx_hash}")
-                            tx_details = response.json()
-                            confirmations = tx_details.get("status", {}).get("block_height", 0)
+                        response = await http_clients.get("blockstream").get(f"{self.BLOCKSTREAM_API}/tx/{tx_hash}")
+                        tx_details = response.json()
+                        confirmations = tx_details.get("status", {}).get("block_height", 0)
                     except:
                         confirmations = 1
 
@@ -1,8 +1,8 @@
 import asyncio
-import httpx
 import logging
 from typing import Callable, Awaitable, Dict
 from .base_listener import BlockchainListener
+from ..services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -34,20 +34,19 @@ class USDCListener(BlockchainListener):
         for address in self.monitored_addresses.copy():
             try:
                 # Get ERC-20 transfers for the address
-                async with httpx.AsyncClient() as client:
-                    params = {
-                        "module": "account",
-                        "action": "tokentx",
-                        "contractaddress": self.USDC_CONTRACT,
-                        "address": address,
-                        "page": 1,
-                        "offset": 10,
-                        "sort": "desc",
-                        "apikey": self.API_KEY
-                    }
-
-                    response = await client.get(self.BASESCAN_API, params=params)
-                    data = response.json()
+                params = {
+                    "module": "account",
+                    "action": "tokentx",
+                    "contractaddress": self.USDC_CONTRACT,
+                    "address": address,
+                    "page": 1,
+                    "offset": 10,
+                    "sort": "desc",
+                    "apikey": self.API_KEY
+                }
+
+                response = await http_clients.get("basescan").get(self.BASESCAN_API, params=params)
+                data = response.json()
 
                 if data.get("status") == "1":
                     transactions = data.get("result", [])
@@ -1,11 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import invoices, webhooks
-from .database import engine, Base
-from .listeners import start_listeners
-from .services.exchange_rate import ExchangeRateService
+from .routers import invoices, quotes, stats, webhooks
+from .database import engine, replica_engine, read_router, Base
+from .migrations import run_migrations
+from .listeners import listener_manager, start_listeners
+from .services.archive_service import archiver
+from .services.exchange_rate import exchange_service, rate_history
+from .services.expiry_scheduler import expiry_scheduler
+from .services.http_clients import http_clients
+from .services.idempotency import idempotency_store
+from .services.invoice_cache import invoice_cache
+from .services.invoice_events import invoice_events
+from .services.invoice_watcher import invoice_watcher
+from .services.status_writer import status_writer
+from typing import Optional
+import time
 import asyncio
 
+# Task running the blockchain listeners, kept so it is not garbage collected
+listener_task: Optional[asyncio.Task] = None
+
 async def create_tables():
     """Create database tables asynchronously"""
     async with engine.begin() as conn:
@@ -24,17 +38,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Idempotent-Replayed"],
 )
 
 # Include routers
 app.include_router(invoices.router, prefix="/api", tags=["invoices"])
+app.include_router(quotes.router, prefix="/api", tags=["quotes"])
+app.include_router(stats.router, prefix="/api", tags=["stats"])
 app.include_router(webhooks.router, prefix="/api", tags=["webhooks"])
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and start blockchain listeners on app startup"""
+    global listener_task
     await create_tables()
-    await start_listeners()
+    await run_migrations(engine)
+    http_clients.open()
+    rate_history.start_persistence()
+    exchange_service.start_feeder()
+    await expiry_scheduler.start()
+    archiver.start()
+    status_writer.start()
+    # Listeners run forever, so they must not block startup
+    listener_task = asyncio.create_task(start_listeners())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and close outbound connections on app shutdown"""
+    # Listeners stop first, so nothing is submitted after the status writer drains
+    await listener_manager.stop()
+    if listener_task is not None:
+        await asyncio.gather(listener_task, return_exceptions=True)
+    # Commits the status events still queued before anything else stops
+    await status_writer.stop()
+    # Their webhooks still need the outbound HTTP clients
+    await listener_manager.wait_for_webhooks()
+    await archiver.stop()
+    await expiry_scheduler.stop()
+    await exchange_service.stop_feeder()
+    await rate_history.stop_persistence()
+    await http_clients.close()
+    # Close pooled database connections once nothing writes any more
+    if replica_engine is not engine:
+        await replica_engine.dispose()
+    await engine.dispose()
 
 @app.get("/")
 async def root():
@@ -44,9 +91,84 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/http-pools")
+async def get_http_pool_stats():
+    """Get per-upstream connection pool usage and wait times"""
+    return http_clients.stats()
+
+@app.get("/api/invoice-cache")
+async def get_invoice_cache_stats():
+    """Get hit rate, size and memory use of the invoice cache"""
+    return invoice_cache.stats()
+
+@app.get("/api/invoice-watchers")
+async def get_invoice_watcher_stats():
+    """Get the number of requests long-polling invoice status"""
+    return invoice_watcher.stats()
+
+@app.get("/api/idempotency")
+async def get_idempotency_stats():
+    """Get stored, replayed and coalesced Idempotency-Key requests"""
+    return idempotency_store.stats()
+
+@app.get("/api/invoice-events")
+async def get_invoice_events_stats():
+    """Get open SSE/WebSocket subscriptions and delivery counts"""
+    return invoice_events.stats()
+
+@app.get("/api/read-routing")
+async def get_read_routing_stats():
+    """Get reads served by the replica and by the primary for read-your-writes"""
+    return read_router.stats()
+
+@app.get("/api/status-writer")
+async def get_status_writer_stats():
+    """Get queue size and batch sizes of the status event group commit"""
+    return status_writer.stats()
+
+@app.get("/api/expiry-scheduler")
+async def get_expiry_scheduler_stats():
+    """Get queue size and lag of the invoice expiry scheduler"""
+    return expiry_scheduler.stats()
+
+@app.get("/api/archive")
+async def get_archive_stats():
+    """Get progress of the invoice archival job"""
+    return archiver.stats()
+
 @app.get("/api/exchange-rates")
 async def get_exchange_rates():
     """Get current exchange rates for supported cryptocurrencies"""
-    exchange_service = ExchangeRateService()
     rates = await exchange_service.get_rates()
     return rates
+
+@app.get("/api/exchange-rates/cache")
+async def get_exchange_rate_cache_stats():
+    """Get hit/miss/age counters of the exchange rate cache"""
+    return exchange_service.cache_stats()
+
+@app.get("/api/exchange-rates/history")
+async def get_exchange_rate_history(
+    asset: str = "BTC",
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    buckets: int = Query(200, ge=1, le=2000)
+):
+    """Get asset/PEN rate history downsampled to min/max/avg buckets
+
+    since and until are unix timestamps; the default range is the last 24 hours.
+    """
+    if asset not in exchange_service.SUPPORTED_ASSETS:
+        raise HTTPException(status_code=400, detail=f"Unsupported asset: {asset}")
+    until = until if until is not None else time.time()
+    since = since if since is not None else until - 86400
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+
+    return {
+        "asset": asset,
+        "since": since,
+        "until": until,
+        "bucket_seconds": (until - since) / buckets,
+        "points": rate_history.query(asset, since, until, buckets),
+    }
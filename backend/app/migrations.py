@@ -0,0 +1,126 @@
+# Payo Backend - Versioned schema migrations
+
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .models.models import IdempotencyKey, Invoice, InvoiceRollup, Payment, invoices_archive, payments_archive
+from .services.rollup_service import RollupService
+
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata so create_all never marks migrations as applied
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+def _add_columns(table: Table, *names: str) -> Callable[[Connection], None]:
+    """Add columns from the model that an older database is missing"""
+    def apply(conn: Connection):
+        existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+        for name in names:
+            if name in existing:
+                continue
+            column = table.c[name]
+            column_type = column.type.compile(dialect=conn.dialect)
+            # Existing rows need a value for NOT NULL columns
+            default = " NOT NULL DEFAULT ''" if not column.nullable else ""
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}{default}"))
+    return apply
+
+def _create_indexes(table: Table, *names: str) -> Callable[[Connection], None]:
+    """Create indexes declared on the model that do not exist yet"""
+    def apply(conn: Connection):
+        for index in table.indexes:
+            if index.name in names:
+                index.create(conn, checkfirst=True)
+    return apply
+
+def _dedupe_payments(conn: Connection):
+    """Keep the first payment per (tx_hash, invoice_id) so the unique index can be built"""
+    conn.execute(text(
+        "DELETE FROM payments WHERE id NOT IN "
+        "(SELECT MIN(id) FROM payments GROUP BY tx_hash, invoice_id)"
+    ))
+
+def _create_table(table: Table) -> Callable[[Connection], None]:
+    def apply(conn: Connection):
+        table.create(conn, checkfirst=True)
+    return apply
+
+def _rebuild_rollups(conn: Connection):
+    """Backfill invoice_rollups from the invoices already written"""
+    for stmt in RollupService.rebuild_statements(conn.dialect.name):
+        conn.execute(stmt)
+
+def _steps(*steps: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def apply(conn: Connection):
+        for step in steps:
+            step(conn)
+    return apply
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Add invoices.payment_url and invoices.qr_data", _add_columns(
+        Invoice.__table__, "payment_url", "qr_data"
+    )),
+    Migration(2, "Index invoice listing, pending expiry and payment lookups", _steps(
+        _create_indexes(
+            Invoice.__table__,
+            "ix_invoices_user_created_id",
+            "ix_invoices_user_status_created",
+            "ix_invoices_user_method_created",
+            "ix_invoices_pending_expires_at",
+        ),
+        _dedupe_payments,
+        _create_indexes(Payment.__table__, "ix_payments_invoice_id", "uq_payments_tx_hash_invoice_id"),
+    )),
+    Migration(3, "Add invoices.previous_status and backfill invoice_rollups", _steps(
+        _add_columns(Invoice.__table__, "previous_status"),
+        _create_table(InvoiceRollup.__table__),
+        _rebuild_rollups,
+    )),
+    Migration(4, "Add invoice and payment archive tables", _steps(
+        _create_indexes(Invoice.__table__, "ix_invoices_status_updated"),
+        _create_table(invoices_archive),
+        _create_table(payments_archive),
+    )),
+    Migration(5, "Add idempotency_keys table", _create_table(IdempotencyKey.__table__)),
+]
+
+def apply_migrations(conn: Connection) -> List[int]:
+    """Apply pending migrations in version order; returns the versions applied"""
+    if conn.dialect.name == "postgresql":
+        # Serialize workers starting at the same time; released at commit
+        conn.execute(text("SELECT pg_advisory_xact_lock(7260001)"))
+    schema_migrations.create(conn, checkfirst=True)
+    applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    newly_applied = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        migration.apply(conn)
+        conn.execute(schema_migrations.insert().values(
+            version=migration.version,
+            description=migration.description,
+            applied_at=datetime.utcnow()
+        ))
+        newly_applied.append(migration.version)
+    return newly_applied
+
+async def run_migrations(engine: AsyncEngine) -> List[int]:
+    """Apply pending migrations in one transaction"""
+    async with engine.begin() as conn:
+        return await conn.run_sync(apply_migrations)
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Float, Text, Boolean, ForeignKey, Index, LargeBinary, Table
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from ..database import Base
 
 class User(Base):
@@ -26,14 +26,34 @@ class Invoice(Base):
     chain = Column(String, nullable=False)
     address_or_pr = Column(Text, nullable=False)
     status = Column(String, nullable=False, default="pending")
+    previous_status = Column(String)  # status before the last transition
     description = Column(Text)
     expires_at = Column(DateTime(timezone=True), nullable=False)
+    payment_url = Column(String, nullable=False)
+    qr_data = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="invoices")
     payment = relationship("Payment", back_populates="invoice", uselist=False)
 
+    __table_args__ = (
+        # Keyset pagination: WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+        Index("ix_invoices_user_created_id", "user_id", "created_at", "id"),
+        # Filtered listing: WHERE user_id = ? AND status = ? [AND method = ?] ORDER BY created_at DESC, id DESC
+        Index("ix_invoices_user_status_created", "user_id", "status", "created_at", "id"),
+        # WHERE user_id = ? AND method = ? ORDER BY created_at DESC, id DESC
+        Index("ix_invoices_user_method_created", "user_id", "method", "created_at", "id"),
+        # Archival: WHERE status IN ('confirmed', 'expired') AND updated_at < ?
+        Index("ix_invoices_status_updated", "status", "updated_at"),
+        # Expiry and listener scans only ever look at pending invoices, a small slice of the table
+        Index(
+            "ix_invoices_pending_expires_at", "expires_at",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'")
+        ),
+    )
+
 class Payment(Base):
     __tablename__ = "payments"
 
@@ -47,6 +67,67 @@ class Payment(Base):
 
     invoice = relationship("Invoice", back_populates="payment")
 
+    __table_args__ = (
+        Index("ix_payments_invoice_id", "invoice_id"),
+        # One row per transaction per invoice, so repeated detections can upsert
+        Index("uq_payments_tx_hash_invoice_id", "tx_hash", "invoice_id", unique=True),
+    )
+
+class InvoiceRollup(Base):
+    """Invoice count and PEN total per merchant, creation day, method and status
+
+    Maintained by InvoiceService in the same transaction as each invoice write.
+    """
+    __tablename__ = "invoice_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day the invoices were created
+    method = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    amount_pen_cents = Column(BigInteger, nullable=False, default=0)  # exact, unlike invoices.amount_pen
+
+class IdempotencyKey(Base):
+    """Response to a request sent with an Idempotency-Key header, replayed to its retries
+
+    Only written when IDEMPOTENCY_DB is enabled; see IdempotencyStore.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)  # "<user_id>:<Idempotency-Key header>"
+    fingerprint = Column(String, nullable=False)  # SHA-256 of the request body
+    status_code = Column(Integer, nullable=False)
+    body = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+def _archive_table(table: Table, name: str, *indexes: Index) -> Table:
+    """Table with the columns of table plus archived_at, without foreign keys"""
+    return Table(
+        name,
+        Base.metadata,
+        *[
+            Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+            for column in table.columns
+        ],
+        Column("archived_at", DateTime(timezone=True), nullable=False),
+        *indexes
+    )
+
+# Terminal invoices and their payments moved out of the hot tables by ArchiveService
+invoices_archive = _archive_table(
+    Invoice.__table__, "invoices_archive",
+    Index("ix_invoices_archive_user_created_id", "user_id", "created_at", "id")
+)
+payments_archive = _archive_table(
+    Payment.__table__, "payments_archive",
+    Index("ix_payments_archive_invoice_id", "invoice_id")
+)
+
 class Settings(Base):
     __tablename__ = "settings"
 
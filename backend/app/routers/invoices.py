@@ -1,19 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.websockets import WebSocketState
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from ..database import get_db
+from typing import List, Optional, Tuple
+from ..database import AsyncSessionLocal, ReadSessionLocal, get_db, get_read_db, read_router
 from ..models.models import Invoice
-from ..services.invoice_service import InvoiceService
-from pydantic import BaseModel
+from ..services.invoice_service import InvoiceService, encode_cursor
+from ..services.invoice_cache import invoice_cache
+from ..services.invoice_events import invoice_events
+from ..services.invoice_watcher import invoice_watcher
+from ..services.exchange_rate import RateUnavailableError
+from ..services.idempotency import IdempotencyError, idempotency_store, request_fingerprint
+from ..utils.serialization import JSONBytesResponse, dumps
+from pydantic import BaseModel, Field, conlist
+from datetime import datetime
+import asyncio
+import csv
+import io
+import json
 
 router = APIRouter()
 
+# Largest number of invoices accepted in one batch request
+MAX_BATCH_INVOICES = 1000
+# Longest a GET /invoices/{invoice_id}?wait= request is parked, in seconds
+MAX_WAIT_SECONDS = 60
+# Seconds between SSE keepalive comments, which stop proxies closing idle streams
+SSE_KEEPALIVE_SECONDS = 15
+# Most invoices one WebSocket connection may subscribe to
+MAX_SOCKET_SUBSCRIPTIONS = 1000
+# Largest page of GET /invoices
+MAX_LIST_LIMIT = 500
+
 # Pydantic models for API
 class CreateInvoiceRequest(BaseModel):
+    amount_pen: Optional[float] = None  # may be omitted when quote_id is given
+    method: Optional[str] = None  # BTC_LN, BTC, USDC_BASE
+    description: Optional[str] = None
+    quote_id: Optional[str] = None  # from POST /api/quotes; locks the quoted rate
+
+class BatchInvoiceItem(BaseModel):
     amount_pen: float
     method: str  # BTC_LN, BTC, USDC_BASE
     description: Optional[str] = None
 
+class BatchCreateInvoiceRequest(BaseModel):
+    items: conlist(BatchInvoiceItem, min_items=1, max_items=MAX_BATCH_INVOICES)
+
 class CreateInvoiceResponse(BaseModel):
     invoice_id: str
     method: str
@@ -42,111 +76,397 @@ class InvoiceResponse(BaseModel):
     payment_url: str
     qr_data: str
 
+class InvoiceSummaryResponse(BaseModel):
+    """Invoice list row: InvoiceResponse without payment details, description shortened"""
+    id: str
+    amount_pen: float
+    amount_crypto: str
+    asset: str
+    chain: str
+    method: str
+    status: str
+    description: Optional[str]
+    expires_at: str
+    created_at: str
+    updated_at: str
+    payment_url: str
+
+# InvoiceResponse fields, in order; also the invoice columns read for it
+INVOICE_FIELDS = tuple(InvoiceResponse.__fields__)
+# InvoiceSummaryResponse fields, in order, and the invoice columns read for them
+SUMMARY_FIELDS = tuple(InvoiceSummaryResponse.__fields__)
+SUMMARY_COLUMNS = InvoiceService.summary_columns(SUMMARY_FIELDS)
+
+def invoice_view(invoice) -> dict:
+    """InvoiceResponse-shaped dict of an Invoice or row, ready for dumps()"""
+    return {field: getattr(invoice, field) for field in INVOICE_FIELDS}
+
+def invoice_etag(invoice) -> str:
+    """ETag of an invoice's view; every status change moves updated_at"""
+    return f'"{invoice.updated_at:%Y%m%d%H%M%S%f}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header value matches etag"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+async def load_invoice_view(db: AsyncSession, invoice_id: str) -> Tuple[bytes, str]:
+    """(body, etag) of an invoice from the invoice cache or the database; 404 if absent"""
+    cached = invoice_cache.get(invoice_id)
+    if cached is not None:
+        return cached
+    token = invoice_cache.token()
+    invoice = await InvoiceService.get_invoice(db, invoice_id, columns=InvoiceService.DETAIL_COLUMNS)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+
+    body, etag = dumps(invoice_view(invoice)), invoice_etag(invoice)
+    invoice_cache.put(invoice_id, body, etag, token)
+    return body, etag
+
 class InvoiceFilters(BaseModel):
     status: Optional[str] = None
     method: Optional[str] = None
-    limit: int = 50
-    offset: int = 0
+    limit: int = Field(50, ge=1, le=MAX_LIST_LIMIT)
+    offset: int = Field(0, ge=0)
+    cursor: Optional[str] = None
 
 @router.post("/invoices", response_model=CreateInvoiceResponse)
 async def create_invoice(
     request: CreateInvoiceRequest,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create a new invoice
+
+    Retries sent with the same Idempotency-Key header get the original response
+    back byte for byte, marked Idempotent-Replayed: true, instead of creating
+    another invoice; concurrent ones wait for the first.
+    """
+    # For now, use user_id=1 (in production, get from auth)
+    user_id = 1
+
+    async def create() -> Tuple[int, bytes]:
+        try:
+            invoice = await InvoiceService.create_invoice(
+                db=db,
+                user_id=user_id,
+                amount_pen=request.amount_pen,
+                method=request.method,
+                description=request.description,
+                quote_id=request.quote_id
+            )
+
+            return 200, dumps(CreateInvoiceResponse(
+                invoice_id=invoice.id,
+                method=invoice.method,
+                amount_pen=invoice.amount_pen,
+                amount_crypto=invoice.amount_crypto,
+                asset=invoice.asset,
+                chain=invoice.chain,
+                address_or_pr=invoice.address_or_pr,
+                expires_at=invoice.expires_at.isoformat(),
+                payment_url=invoice.payment_url,
+                qr_data=invoice.qr_data
+            ).dict())
+        except RateUnavailableError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error creating invoice: {str(e)}")
+
+    if idempotency_key is None:
+        status_code, body = await create()
+        return JSONBytesResponse(body, status_code=status_code)
+
+    try:
+        response, replayed = await idempotency_store.run(
+            db,
+            f"{user_id}:{idempotency_key}",
+            request_fingerprint(request.json().encode()),
+            create
+        )
+    except HTTPException:
+        raise
+    except IdempotencyError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating invoice: {str(e)}")
+
+    headers = {"Idempotent-Replayed": "true"} if replayed else {}
+    return JSONBytesResponse(response.body, status_code=response.status_code, headers=headers)
+
+@router.post("/invoices:batch")
+async def create_invoices_batch(
+    request: BatchCreateInvoiceRequest,
     db: AsyncSession = Depends(get_db)
 ):
-    """Create a new invoice"""
+    """Create many invoices in one transaction
+
+    The response streams one CreateInvoiceResponse JSON object per line (NDJSON),
+    in request order.
+    """
     try:
         # For now, use user_id=1 (in production, get from auth)
         user_id = 1
 
-        invoice = await InvoiceService.create_invoice(
+        rows = await InvoiceService.create_invoices(
             db=db,
             user_id=user_id,
-            amount_pen=request.amount_pen,
-            method=request.method,
-            description=request.description
-        )
-
-        return CreateInvoiceResponse(
-            invoice_id=invoice.id,
-            method=invoice.method,
-            amount_pen=invoice.amount_pen,
-            amount_crypto=invoice.amount_crypto,
-            asset=invoice.asset,
-            chain=invoice.chain,
-            address_or_pr=invoice.address_or_pr,
-            expires_at=invoice.expires_at.isoformat(),
-            payment_url=invoice.payment_url,
-            qr_data=invoice.qr_data
+            items=[(item.amount_pen, item.method, item.description) for item in request.items]
         )
+        # Commit before streaming so clients never see invoices that could still roll back
+        await db.commit()
+    except RateUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error creating invoice: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating invoices: {str(e)}")
+
+    def stream_rows():
+        for row in rows:
+            yield dumps({
+                "invoice_id": row["id"],
+                "method": row["method"],
+                "amount_pen": row["amount_pen"],
+                "amount_crypto": row["amount_crypto"],
+                "asset": row["asset"],
+                "chain": row["chain"],
+                "address_or_pr": row["address_or_pr"],
+                "expires_at": row["expires_at"],
+                "payment_url": row["payment_url"],
+                "qr_data": row["qr_data"]
+            }) + b"\n"
+
+    return StreamingResponse(stream_rows(), media_type="application/x-ndjson")
+
+@router.get("/invoices/export")
+async def export_invoices(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    method: Optional[str] = None
+):
+    """Export all invoices, archived ones included, with their payments as NDJSON or CSV
+
+    Archived invoices come first, then live ones, each oldest first. Rows are
+    streamed from server-side cursors, so exports of any size use constant
+    memory. Invoices with several payments appear once per payment.
+    """
+    # For now, use user_id=1 (in production, get from auth)
+    user_id = 1
+    columns = InvoiceService.EXPORT_FIELDS
 
-@router.get("/invoices/{invoice_id}", response_model=InvoiceResponse)
+    def format_value(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    async def stream_rows():
+        # Owns its session: the response body outlives the request's dependencies
+        async with ReadSessionLocal() as session:
+            read_router.route(session, user_id)
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(columns)
+                yield buffer.getvalue()
+            async for rows in InvoiceService.stream_export(session, user_id, status=status, method=method):
+                if format == "csv":
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows([format_value(value) for value in row] for row in rows)
+                    yield buffer.getvalue()
+                else:
+                    yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="invoices.{format}"'}
+    )
+
+@router.get("/invoices/{invoice_id}", response_model=InvoiceResponse, responses={304: {"description": "Not modified"}})
 async def get_invoice(
     invoice_id: str,
+    wait: int = Query(0, ge=0, le=MAX_WAIT_SECONDS),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get invoice by ID"""
-    invoice = await InvoiceService.get_invoice(db, invoice_id)
-    if not invoice:
-        raise HTTPException(status_code=404, detail="Invoice not found")
+    """Get invoice by ID
+
+    Served from the invoice cache when possible, since payment pages poll this.
+    Responses carry an ETag; a request whose If-None-Match still matches gets a
+    304. With ?wait=N such a request is parked for up to N seconds until the
+    invoice's status changes, so pollers can ask again right away.
+    """
+    with invoice_watcher.watch(invoice_id) as changed:
+        body, etag = await load_invoice_view(db, invoice_id)
+        if wait and if_none_match is not None and etag_matches(if_none_match, etag):
+            # Give the connection back to the pool while parked
+            await db.rollback()
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                body, etag = await load_invoice_view(db, invoice_id)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONBytesResponse(body, headers=headers)
+
+@router.get("/invoices/{invoice_id}/events")
+async def stream_invoice_events(
+    invoice_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream an invoice's status changes as server-sent events
+
+    The first event, "invoice", carries the current InvoiceResponse; every
+    status change then sends an "invoice.updated" event. A client that falls
+    too far behind is disconnected, and EventSource reconnects with a fresh
+    snapshot.
+    """
+    # Subscribe before reading, so a change committed in between is not missed
+    subscription = invoice_events.subscribe([invoice_id])
+    try:
+        body, _ = await load_invoice_view(db, invoice_id)
+    except BaseException:
+        subscription.close()
+        raise
+    # Give the connection back to the pool while streaming
+    await db.rollback()
 
-    return InvoiceResponse(
-        id=invoice.id,
-        amount_pen=invoice.amount_pen,
-        amount_crypto=invoice.amount_crypto,
-        asset=invoice.asset,
-        chain=invoice.chain,
-        method=invoice.method,
-        address_or_pr=invoice.address_or_pr,
-        status=invoice.status,
-        description=invoice.description,
-        expires_at=invoice.expires_at.isoformat(),
-        created_at=invoice.created_at.isoformat(),
-        updated_at=invoice.updated_at.isoformat(),
-        payment_url=invoice.payment_url,
-        qr_data=invoice.qr_data
+    async def stream_events():
+        yield b"event: invoice\ndata: " + body + b"\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if message is None:
+                break
+            yield b"event: invoice.updated\ndata: " + message + b"\n\n"
+
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also runs when the client disconnects mid-stream
+        background=BackgroundTask(subscription.close)
     )
 
-@router.get("/invoices", response_model=List[InvoiceResponse])
+@router.websocket("/invoices/events")
+async def invoice_events_socket(websocket: WebSocket):
+    """Status events of many invoices over one WebSocket
+
+    Send {"subscribe": [invoice_id, ...]} or {"unsubscribe": [...]}. Each newly
+    subscribed invoice gets {"type": "invoice", "invoice": InvoiceResponse}, or
+    {"type": "error", ...} if it does not exist, and then one
+    {"type": "invoice.updated", ...} per status change. Connections that fall
+    too far behind are closed with code 1013.
+    """
+    await websocket.accept()
+    subscription = invoice_events.subscribe()
+    send_lock = asyncio.Lock()
+
+    async def send(message: bytes):
+        async with send_lock:
+            await websocket.send_text(message.decode())
+
+    async def subscribe(invoice_ids: List[str]):
+        new_ids = [invoice_id for invoice_id in dict.fromkeys(invoice_ids) if invoice_id not in subscription.invoice_ids]
+        if len(subscription.invoice_ids) + len(new_ids) > MAX_SOCKET_SUBSCRIPTIONS:
+            await send(dumps({"type": "error", "detail": f"At most {MAX_SOCKET_SUBSCRIPTIONS} subscriptions per connection"}))
+            return
+        subscription.add(new_ids)
+        async with AsyncSessionLocal() as session:
+            for invoice_id in new_ids:
+                try:
+                    body, _ = await load_invoice_view(session, invoice_id)
+                except HTTPException as e:
+                    subscription.remove([invoice_id])
+                    await send(dumps({"type": "error", "invoice_id": invoice_id, "detail": e.detail}))
+                    continue
+                await send(b'{"type":"invoice","invoice":' + body + b"}")
+
+    async def receive():
+        try:
+            while True:
+                try:
+                    request = json.loads(await websocket.receive_text())
+                except ValueError:
+                    request = None
+                action = next((key for key in ("subscribe", "unsubscribe") if isinstance(request, dict) and key in request), None)
+                invoice_ids = request[action] if action else None
+                if not isinstance(invoice_ids, list) or not all(isinstance(invoice_id, str) for invoice_id in invoice_ids):
+                    await send(dumps({"type": "error", "detail": 'Expected {"subscribe": [...]} or {"unsubscribe": [...]}'}))
+                elif action == "subscribe":
+                    await subscribe(invoice_ids)
+                else:
+                    subscription.remove(invoice_ids)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            subscription.close()
+
+    reader = asyncio.create_task(receive())
+    try:
+        while True:
+            message = await subscription.get()
+            if message is None:
+                break
+            await send(message)
+        if subscription.evicted and websocket.application_state == WebSocketState.CONNECTED:
+            await websocket.close(code=1013)
+    finally:
+        reader.cancel()
+        subscription.close()
+
+@router.get("/invoices", response_model=List[InvoiceSummaryResponse])
 async def list_invoices(
     status: Optional[str] = None,
     method: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
-    db: AsyncSession = Depends(get_db)
+    limit: int = Query(50, ge=1, le=MAX_LIST_LIMIT),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List invoices with optional filters"""
+    """List invoices with optional filters
+
+    Pass the X-Next-Cursor header of a page as ?cursor= to get the next one;
+    limit/offset paging still works but gets slower with depth. Rows are
+    summaries; fetch /invoices/{invoice_id} for payment details.
+    """
     # For now, use user_id=1 (in production, get from auth)
     user_id = 1
+    read_router.route(db, user_id)
 
-    invoices = await InvoiceService.list_invoices(
-        db=db,
-        user_id=user_id,
-        status=status,
-        method=method,
-        limit=limit,
-        offset=offset
-    )
-
-    return [
-        InvoiceResponse(
-            id=invoice.id,
-            amount_pen=invoice.amount_pen,
-            amount_crypto=invoice.amount_crypto,
-            asset=invoice.asset,
-            chain=invoice.chain,
-            method=invoice.method,
-            address_or_pr=invoice.address_or_pr,
-            status=invoice.status,
-            description=invoice.description,
-            expires_at=invoice.expires_at.isoformat(),
-            created_at=invoice.created_at.isoformat(),
-            updated_at=invoice.updated_at.isoformat(),
-            payment_url=invoice.payment_url,
-            qr_data=invoice.qr_data
+    try:
+        rows = await InvoiceService.list_invoices(
+            db=db,
+            user_id=user_id,
+            status=status,
+            method=method,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            columns=SUMMARY_COLUMNS
         )
-        for invoice in invoices
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {}
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+
+    # Rows are already the response shape, so encode them directly instead of
+    # building and then re-validating an InvoiceResponse per row
+    return JSONBytesResponse(dumps([dict(zip(SUMMARY_FIELDS, row)) for row in rows]), headers=headers)
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import Dict, List
+from ..services.exchange_rate import exchange_service, RateUnavailableError
+from ..services.quote_service import QuoteService, quote_store
+from pydantic import BaseModel, conlist
+
+router = APIRouter()
+
+# Largest number of conversions accepted in one batch request
+MAX_BATCH_QUOTES = 10000
+
+# Pydantic models for API
+class CreateQuoteRequest(BaseModel):
+    amount_pen: float
+    method: str  # BTC_LN, BTC, USDC_BASE
+
+class QuoteResponse(BaseModel):
+    quote_id: str
+    amount_pen: float
+    method: str
+    asset: str
+    rate: str  # PEN per unit of asset, locked until expires_at
+    amount_crypto: str
+    expires_at: str
+    ttl_seconds: float
+
+class QuoteItem(BaseModel):
+    amount_pen: float
+    method: str  # BTC_LN, BTC, USDC_BASE
+
+class BatchQuoteRequest(BaseModel):
+    items: conlist(QuoteItem, min_items=1, max_items=MAX_BATCH_QUOTES)
+
+class QuoteItemResponse(BaseModel):
+    amount_pen: float
+    method: str
+    asset: str
+    amount_crypto: str
+
+class BatchQuoteResponse(BaseModel):
+    rates: Dict[str, str]  # asset -> PEN per unit used for every item
+    quotes: List[QuoteItemResponse]
+
+@router.post("/quotes", response_model=QuoteResponse)
+async def create_quote(request: CreateQuoteRequest):
+    """Lock a rate for a PEN amount; pass the quote_id to POST /api/invoices"""
+    try:
+        quote = await QuoteService.create_quote(request.amount_pen, request.method)
+    except RateUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return QuoteResponse(
+        quote_id=quote.id,
+        amount_pen=quote.amount_pen,
+        method=quote.method,
+        asset=quote.asset,
+        rate=str(quote.rate),
+        amount_crypto=quote.amount_crypto,
+        expires_at=datetime.utcfromtimestamp(quote.expires_at).isoformat(),
+        ttl_seconds=quote_store.ttl
+    )
+
+@router.get("/quotes/stats")
+async def get_quote_stats():
+    """Get quote store size and counters"""
+    return quote_store.stats()
+
+@router.post("/quotes:batch", response_model=BatchQuoteResponse)
+async def batch_quotes(request: BatchQuoteRequest):
+    """Convert many PEN amounts at once, resolving each rate a single time"""
+    try:
+        rates = await exchange_service.pricing_rates({item.method for item in request.items})
+        amounts = await exchange_service.convert_many(
+            [(item.amount_pen, item.method) for item in request.items],
+            rates=rates
+        )
+    except RateUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return BatchQuoteResponse(
+        rates={asset: str(rate) for asset, rate in rates.items()},
+        quotes=[
+            QuoteItemResponse(
+                amount_pen=item.amount_pen,
+                method=item.method,
+                asset=exchange_service.METHOD_ASSETS[item.method],
+                amount_crypto=amount
+            )
+            for item, amount in zip(request.items, amounts)
+        ]
+    )
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from ..database import get_read_db, read_router
+from ..services.rollup_service import RollupService
+from pydantic import BaseModel
+
+router = APIRouter()
+
+# Widest date range one stats request may cover
+MAX_STATS_DAYS = 366
+
+class StatsTotals(BaseModel):
+    invoice_count: int
+    amount_pen: float
+
+class StatsRow(StatsTotals):
+    day: str
+    method: str
+    status: str
+
+class StatsResponse(BaseModel):
+    since: str
+    until: str
+    totals: StatsTotals
+    by_status: Dict[str, StatsTotals]
+    by_method: Dict[str, StatsTotals]
+    rows: List[StatsRow]
+
+def _add(totals: Dict[str, List[int]], key: str, count: int, cents: int):
+    entry = totals.setdefault(key, [0, 0])
+    entry[0] += count
+    entry[1] += cents
+
+def _totals(count: int, cents: int) -> StatsTotals:
+    return StatsTotals(invoice_count=count, amount_pen=cents / 100)
+
+@router.get("/stats", response_model=StatsResponse)
+async def get_stats(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    method: Optional[str] = None,
+    status: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Invoice counts and PEN totals per day, method and status
+
+    Days are UTC creation days, and the default range is the last 30 days.
+    Answered from the invoice rollups, so cost grows with days, not invoices.
+    """
+    # For now, use user_id=1 (in production, get from auth)
+    user_id = 1
+    read_router.route(db, user_id)
+
+    until = until or datetime.utcnow().date()
+    since = since or until - timedelta(days=29)
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    if (until - since).days >= MAX_STATS_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_STATS_DAYS} days")
+
+    rollups = await RollupService.get_stats(db, user_id, since, until, method=method, status=status)
+
+    total_count, total_cents = 0, 0
+    by_status: Dict[str, List[int]] = {}
+    by_method: Dict[str, List[int]] = {}
+    for rollup in rollups:
+        total_count += rollup.invoice_count
+        total_cents += rollup.amount_pen_cents
+        _add(by_status, rollup.status, rollup.invoice_count, rollup.amount_pen_cents)
+        _add(by_method, rollup.method, rollup.invoice_count, rollup.amount_pen_cents)
+
+    return StatsResponse(
+        since=since.isoformat(),
+        until=until.isoformat(),
+        totals=_totals(total_count, total_cents),
+        by_status={key: _totals(*value) for key, value in by_status.items()},
+        by_method={key: _totals(*value) for key, value in by_method.items()},
+        rows=[
+            StatsRow(
+                day=rollup.day.isoformat(),
+                method=rollup.method,
+                status=rollup.status,
+                invoice_count=rollup.invoice_count,
+                amount_pen=rollup.amount_pen_cents / 100
+            )
+            for rollup in rollups
+        ]
+    )
@@ -53,6 +53,8 @@ async def handle_webhook(
         else:
             raise HTTPException(status_code=400, detail=f"Unknown webhook type: {payload.type}")
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Webhook processing failed: {str(e)}")
 
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import AsyncSessionLocal
+from ..models.models import Invoice, Payment, invoices_archive, payments_archive
+
+logger = logging.getLogger(__name__)
+
+# Days after their last update that terminal invoices move to the archive
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+# Invoices moved per transaction
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+# Seconds between archival runs
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+
+# Statuses an invoice can be archived in
+TERMINAL_STATUSES = ("confirmed", "expired")
+
+class ArchiveService:
+    """Service for moving old terminal invoices and their payments to the archive tables"""
+
+    @staticmethod
+    async def archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> List[str]:
+        """Move up to batch_size terminal invoices last updated before cutoff; returns their IDs
+
+        Runs in db's transaction: rows are copied to the archive and then
+        deleted, so a failure leaves everything in the hot tables.
+        """
+        result = await db.execute(
+            select(Invoice.id)
+            .where(Invoice.status.in_(TERMINAL_STATUSES), Invoice.updated_at < cutoff)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        invoice_ids = result.scalars().all()
+        if not invoice_ids:
+            return []
+
+        now = datetime.utcnow()
+        for source, archive, key in (
+            (Invoice.__table__, invoices_archive, Invoice.__table__.c.id),
+            (Payment.__table__, payments_archive, Payment.__table__.c.invoice_id),
+        ):
+            columns = [column.name for column in source.columns]
+            await db.execute(
+                insert(archive).from_select(
+                    columns + ["archived_at"],
+                    select(*source.columns, literal(now, archive.c.archived_at.type)).where(key.in_(invoice_ids))
+                )
+            )
+        # Payments first: they reference the invoices
+        await db.execute(delete(Payment).where(Payment.invoice_id.in_(invoice_ids)))
+        await db.execute(delete(Invoice).where(Invoice.id.in_(invoice_ids)))
+        return invoice_ids
+
+    @staticmethod
+    async def get_archived_invoice(db: AsyncSession, invoice_id: str, columns: Optional[Sequence] = None):
+        """Archived invoice as a detached Invoice, or as a row of the given Invoice columns; None if absent"""
+        if columns:
+            result = await db.execute(
+                select(*[invoices_archive.c[column.key] for column in columns])
+                .where(invoices_archive.c.id == invoice_id)
+            )
+            return result.first()
+        archive_columns = [invoices_archive.c[column.name] for column in Invoice.__table__.columns]
+        result = await db.execute(select(*archive_columns).where(invoices_archive.c.id == invoice_id))
+        row = result.first()
+        return Invoice(**row._mapping) if row is not None else None
+
+class Archiver:
+    """Background job that keeps the hot invoice tables limited to recent invoices"""
+
+    def __init__(
+        self,
+        archive_after_days: float = ARCHIVE_AFTER_DAYS,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        interval: float = ARCHIVE_INTERVAL
+    ):
+        self.archive_after = timedelta(days=archive_after_days)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.archived = 0
+        self.runs = 0
+        self.errors = 0
+        self.last_run: Optional[float] = None
+
+    async def run_once(self) -> int:
+        """Archive everything due, one transaction per batch; returns the number of invoices moved"""
+        cutoff = datetime.utcnow() - self.archive_after
+        moved = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                invoice_ids = await ArchiveService.archive_batch(session, cutoff, self.batch_size)
+                await session.commit()
+            moved += len(invoice_ids)
+            self.archived += len(invoice_ids)
+            if len(invoice_ids) < self.batch_size:
+                break
+            # Let request handlers in between batches
+            await asyncio.sleep(0)
+        self.runs += 1
+        self.last_run = time.time()
+        if moved:
+            logger.info(f"Archived {moved} invoices last updated before {cutoff.isoformat()}")
+        return moved
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Invoice archival failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "archive_after_days": self.archive_after.total_seconds() / 86400,
+            "batch_size": self.batch_size,
+            "interval": self.interval,
+            "archived": self.archived,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_run": self.last_run,
+        }
+
+# Global instance
+archiver = Archiver()
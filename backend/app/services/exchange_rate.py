@@ -1,66 +1,325 @@
-import httpx
-from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import time
+from types import MappingProxyType
+from typing import Awaitable, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
 from decimal import Decimal
+from .rate_providers import RateAggregator, default_aggregator
+from .rate_history import RateHistory
+
+logger = logging.getLogger(__name__)
+
+# Seconds a fetched rate is served as fresh
+RATE_CACHE_TTL = float(os.getenv("EXCHANGE_RATE_CACHE_TTL", "300"))
+# Extra seconds an expired rate may still be served while it is refreshed in the background
+RATE_CACHE_STALE_TTL = float(os.getenv("EXCHANGE_RATE_CACHE_STALE_TTL", "600"))
+# Seconds between background refreshes of the rate snapshot
+RATE_REFRESH_INTERVAL = float(os.getenv("EXCHANGE_RATE_REFRESH_INTERVAL", "30"))
+# Oldest rate (in seconds) an invoice may be priced with before creation is refused
+RATE_MAX_STALENESS = float(os.getenv("EXCHANGE_RATE_MAX_STALENESS", "900"))
+
+class RateUnavailableError(Exception):
+    """Raised when no sufficiently fresh rate is available to price an invoice"""
+    pass
+
+class RateSnapshot(NamedTuple):
+    """Immutable set of rates published by the background feeder"""
+    rates: Mapping[str, Decimal]
+    fetched_at: Mapping[str, float]  # asset -> unix timestamp of the last successful fetch
+
+    def age(self, asset: str) -> float:
+        """Seconds since the rate for asset was fetched"""
+        return time.time() - self.fetched_at[asset]
+
+EMPTY_SNAPSHOT = RateSnapshot(MappingProxyType({}), MappingProxyType({}))
+
+class RateCache:
+    """In-process rate cache with TTL, stale-while-revalidate and single-flight refresh"""
+
+    def __init__(self, ttl: float = RATE_CACHE_TTL, stale_ttl: float = RATE_CACHE_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[str, Tuple[Decimal, float]] = {}  # key -> (rate, fetched_at)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0  # misses that joined an in-flight fetch
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Decimal]]) -> Decimal:
+        """Return the cached rate for key, fetching it at most once concurrently"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            rate, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                return rate
+            if age < self.ttl + self.stale_ttl:
+                # Serve the stale value and refresh without blocking the caller
+                self.stale_hits += 1
+                self._refresh(key, fetch)
+                return rate
+
+        self.misses += 1
+        if key in self._inflight:
+            self.coalesced += 1
+        return await self.refresh(key, fetch)
+
+    async def refresh(self, key: str, fetch: Callable[[], Awaitable[Decimal]]) -> Decimal:
+        """Fetch key now, joining any fetch already in flight"""
+        # Shield so a cancelled caller does not cancel the fetch other callers share
+        return await asyncio.shield(self._refresh(key, fetch))
+
+    def _refresh(self, key: str, fetch: Callable[[], Awaitable[Decimal]]) -> asyncio.Task:
+        """Start a fetch for key unless one is already in flight"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetch))
+            task.add_done_callback(self._consume_error)
+            self._inflight[key] = task
+        return task
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[Decimal]]) -> Decimal:
+        self.fetches += 1
+        try:
+            rate = await fetch()
+        except Exception:
+            self.fetch_errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._entries[key] = (rate, time.monotonic())
+        return rate
+
+    @staticmethod
+    def _consume_error(task: asyncio.Task):
+        """Retrieve failures of background refreshes nobody is awaiting"""
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Exchange rate refresh failed: {task.exception()}")
+
+    def peek(self, key: str) -> Optional[Decimal]:
+        """Return the last fetched rate for key regardless of age"""
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def stats(self) -> Dict:
+        """Cache counters and the age of each cached rate in seconds"""
+        now = time.monotonic()
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "inflight": len(self._inflight),
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "age_seconds": {key: round(now - fetched_at, 3) for key, (_, fetched_at) in self._entries.items()},
+        }
 
 class ExchangeRateService:
     """Service to get exchange rates for PEN to crypto conversion"""
 
-    COINGECKO_API = "https://api.coingecko.com/api/v3"
+    SUPPORTED_ASSETS = ("BTC", "USDC")
 
-    # Fallback rates (in case API is down)
+    # Asset each payment method is priced in
+    METHOD_ASSETS = {
+        "BTC_LN": "BTC",
+        "BTC": "BTC",
+        "USDC_BASE": "USDC"
+    }
+
+    # Display precision of each asset
+    AMOUNT_FORMATS = {
+        "BTC": ".8f",   # BTC has 8 decimals
+        "USDC": ".6f"   # USDC has 6 decimals
+    }
+
+    # Fallback rates (in case API is down), in PEN per unit like the providers
     FALLBACK_RATES = {
-        "BTC": 0.000026,  # 1 PEN = ~0.000026 BTC
-        "USDC": 0.27      # 1 PEN = ~0.27 USDC
+        "BTC": 385000.0,  # 1 BTC = ~385,000 PEN
+        "USDC": 3.70      # 1 USDC = ~3.70 PEN
     }
 
-    async def get_btc_rate(self) -> Decimal:
-        """Get BTC/PEN exchange rate"""
+    def __init__(
+        self,
+        cache: Optional[RateCache] = None,
+        max_staleness: float = RATE_MAX_STALENESS,
+        aggregator: Optional[RateAggregator] = None,
+        history: Optional[RateHistory] = None
+    ):
+        self.cache = cache or RateCache()
+        self.aggregator = aggregator or default_aggregator()
+        self.history = history if history is not None else rate_history
+        self.max_staleness = max_staleness
+        # Replaced wholesale by the feeder, so readers never see a partial update
+        self.snapshot: RateSnapshot = EMPTY_SNAPSHOT
+        self._feeder_task: Optional[asyncio.Task] = None
+
+    async def _fetch_rate(self, asset: str) -> Decimal:
+        """Fetch the asset/PEN rate from the providers, raising on any failure"""
+        rate = await self.aggregator.fetch_rate(asset)
+        self.history.record(asset, rate)
+        return rate
+
+    def _snapshot_rate(self, asset: str) -> Optional[Decimal]:
+        """Rate for asset from the current snapshot, or None if missing or too old"""
+        snapshot = self.snapshot
+        if asset in snapshot.rates and snapshot.age(asset) <= self.max_staleness:
+            return snapshot.rates[asset]
+        return None
+
+    async def get_rate(self, asset: str) -> Decimal:
+        """Get asset/PEN exchange rate from the snapshot, falling back to the cache"""
+        rate = self._snapshot_rate(asset)
+        if rate is not None:
+            return rate
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.COINGECKO_API}/simple/price",
-                    params={
-                        "ids": "bitcoin",
-                        "vs_currencies": "pen"
-                    }
-                )
-                data = response.json()
-                rate = data["bitcoin"]["pen"]
-                return Decimal(str(rate))
+            return await self.cache.get(asset, lambda: self._fetch_rate(asset))
         except Exception:
-            # Fallback to hardcoded rate
-            return Decimal(str(self.FALLBACK_RATES["BTC"]))
+            # Fallback to hardcoded rate (not cached, so the next call retries upstream)
+            return Decimal(str(self.FALLBACK_RATES[asset]))
+
+    async def get_btc_rate(self) -> Decimal:
+        """Get BTC/PEN exchange rate"""
+        return await self.get_rate("BTC")
 
     async def get_usdc_rate(self) -> Decimal:
         """Get USDC/PEN exchange rate"""
+        return await self.get_rate("USDC")
+
+    async def get_rates(self) -> Dict[str, float]:
+        """Get all supported exchange rates"""
+        assets = list(self.SUPPORTED_ASSETS)
+        rates = await asyncio.gather(*(self.get_rate(asset) for asset in assets))
+        return {asset: float(rate) for asset, rate in zip(assets, rates)}
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss/age counters of the rate cache and snapshot ages"""
+        stats = self.cache.stats()
+        snapshot = self.snapshot
+        stats["snapshot_age_seconds"] = {asset: round(snapshot.age(asset), 3) for asset in snapshot.rates}
+        stats["feeder_running"] = self.feeder_running
+        stats["sources"] = self.aggregator.provider_stats()
+        return stats
+
+    async def refresh_snapshot(self) -> RateSnapshot:
+        """Fetch every rate and publish a new snapshot"""
+        assets = list(self.SUPPORTED_ASSETS)
+        results = await asyncio.gather(
+            *(self.cache.refresh(asset, lambda asset=asset: self._fetch_rate(asset)) for asset in assets),
+            return_exceptions=True
+        )
+
+        # Assets that failed keep their previous rate and timestamp
+        previous = self.snapshot
+        rates = dict(previous.rates)
+        fetched_at = dict(previous.fetched_at)
+        now = time.time()
+        for asset, result in zip(assets, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to refresh {asset} rate: {result}")
+                continue
+            rates[asset] = result
+            fetched_at[asset] = now
+
+        self.snapshot = RateSnapshot(MappingProxyType(rates), MappingProxyType(fetched_at))
+        return self.snapshot
+
+    async def _run_feeder(self, interval: float):
+        """Refresh the snapshot every interval seconds"""
+        while True:
+            try:
+                await self.refresh_snapshot()
+            except Exception as e:
+                logger.error(f"Rate feeder failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+    @property
+    def feeder_running(self) -> bool:
+        return self._feeder_task is not None and not self._feeder_task.done()
+
+    def start_feeder(self, interval: float = RATE_REFRESH_INTERVAL):
+        """Start refreshing rates in the background"""
+        if not self.feeder_running:
+            self._feeder_task = asyncio.create_task(self._run_feeder(interval))
+
+    async def stop_feeder(self):
+        """Stop the background refresh task"""
+        if self._feeder_task is not None:
+            self._feeder_task.cancel()
+            try:
+                await self._feeder_task
+            except asyncio.CancelledError:
+                pass
+            self._feeder_task = None
+
+    async def _fetch_pricing_rate(self, asset: str) -> Decimal:
+        """Rate used to price invoices when the snapshot has none; never a hardcoded fallback"""
+        if self.feeder_running and asset in self.snapshot.rates:
+            # The feeder owns refreshes; a rate this old means upstream is down
+            raise RateUnavailableError(f"No {asset} rate newer than {self.max_staleness:.0f}s available")
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.COINGECKO_API}/simple/price",
-                    params={
-                        "ids": "usd-coin",
-                        "vs_currencies": "pen"
-                    }
-                )
-                data = response.json()
-                rate = data["usd-coin"]["pen"]
-                return Decimal(str(rate))
-        except Exception:
-            # Fallback to hardcoded rate
-            return Decimal(str(self.FALLBACK_RATES["USDC"]))
+            return await self.cache.get(asset, lambda: self._fetch_rate(asset))
+        except Exception as e:
+            raise RateUnavailableError(f"Could not fetch {asset} rate: {str(e)}")
+
+    def _method_asset(self, method: str) -> str:
+        asset = self.METHOD_ASSETS.get(method)
+        if asset is None:
+            raise ValueError(f"Unsupported method: {method}")
+        return asset
 
     async def convert_pen_to_crypto(self, amount_pen: float, method: str) -> str:
         """Convert PEN amount to crypto amount based on method"""
-        if method == "BTC_LN" or method == "BTC":
-            rate = await self.get_btc_rate()
-            crypto_amount = Decimal(str(amount_pen)) / rate
-            return f"{crypto_amount:.8f}"  # BTC has 8 decimals
-        elif method == "USDC_BASE":
-            rate = await self.get_usdc_rate()
-            crypto_amount = Decimal(str(amount_pen)) * rate
-            return f"{crypto_amount:.6f}"  # USDC has 6 decimals
-        else:
-            raise ValueError(f"Unsupported method: {method}")
+        asset = self._method_asset(method)
+        # Hot path: read the snapshot, only await when it has no usable rate
+        rate = self._snapshot_rate(asset) or await self._fetch_pricing_rate(asset)
+        return format(Decimal(str(amount_pen)) / rate, self.AMOUNT_FORMATS[asset])
+
+    async def pricing_rates(self, methods: Iterable[str]) -> Dict[str, Decimal]:
+        """Resolve the pricing rate of every asset needed by methods, once per asset"""
+        assets = {self._method_asset(method) for method in methods}
+        rates = {}
+        missing = []
+        for asset in assets:
+            rate = self._snapshot_rate(asset)
+            if rate is None:
+                missing.append(asset)
+            else:
+                rates[asset] = rate
+        if missing:
+            fetched = await asyncio.gather(*(self._fetch_pricing_rate(asset) for asset in missing))
+            rates.update(zip(missing, fetched))
+        return rates
+
+    async def convert_many(
+        self,
+        items: Iterable[Tuple[float, str]],
+        rates: Optional[Dict[str, Decimal]] = None
+    ) -> List[str]:
+        """Convert many (amount_pen, method) pairs, rounding exactly like convert_pen_to_crypto"""
+        items = list(items)
+        if rates is None:
+            rates = await self.pricing_rates({method for _, method in items})
+
+        # Resolve rate and format once per method, then run the Decimal math in a tight loop
+        plan = {}
+        for method in {method for _, method in items}:
+            asset = self._method_asset(method)
+            plan[method] = (rates[asset], self.AMOUNT_FORMATS[asset])
+        return [
+            format(Decimal(str(amount_pen)) / plan[method][0], plan[method][1])
+            for amount_pen, method in items
+        ]
 
-# Global instance
+# Global instances; the feeder records one sample per asset every refresh
+rate_history = RateHistory(sample_interval=RATE_REFRESH_INTERVAL)
 exchange_service = ExchangeRateService()
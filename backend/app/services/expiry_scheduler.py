@@ -0,0 +1,153 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from ..database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Most invoices expired by one UPDATE
+EXPIRY_MAX_BATCH = int(os.getenv("EXPIRY_MAX_BATCH", "500"))
+# Seconds before invoices whose expiry failed are tried again
+EXPIRY_RETRY_DELAY = float(os.getenv("EXPIRY_RETRY_DELAY", "5"))
+
+def _timestamp(moment: datetime) -> float:
+    """Unix timestamp of a database datetime; naive values are UTC"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+class ExpiryScheduler:
+    """Expires pending invoices at their deadline from an in-memory min-heap
+
+    The heap holds (deadline, invoice_id) pairs. Cancelled or rescheduled
+    invoices are left in the heap and skipped when they surface, with
+    _deadlines as the source of truth. Everything due at once is expired by
+    one UPDATE per batch, then the registered callbacks get the expired ids.
+    """
+
+    def __init__(self, max_batch: int = EXPIRY_MAX_BATCH, retry_delay: float = EXPIRY_RETRY_DELAY):
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._callbacks: List[Callable[[List[str]], None]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.expired = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_lag = 0.0  # worst seconds between a deadline and its expiry
+
+    def schedule(self, invoice_id: str, expires_at: datetime):
+        """Expire invoice_id at expires_at unless cancelled first"""
+        deadline = _timestamp(expires_at)
+        self._deadlines[invoice_id] = deadline
+        heapq.heappush(self._heap, (deadline, invoice_id))
+        if self._heap[0][1] == invoice_id:
+            # New earliest deadline; the run loop is sleeping until a later one
+            self._wakeup.set()
+
+    def cancel(self, invoice_ids: List[str]):
+        """Stop tracking invoices that are no longer pending"""
+        for invoice_id in invoice_ids:
+            self._deadlines.pop(invoice_id, None)
+
+    def add_callback(self, callback: Callable[[List[str]], None]):
+        """Call callback with the ids of every batch of invoices expired"""
+        self._callbacks.append(callback)
+
+    def _next_deadline(self) -> Optional[float]:
+        while self._heap:
+            deadline, invoice_id = self._heap[0]
+            if self._deadlines.get(invoice_id) == deadline:
+                return deadline
+            heapq.heappop(self._heap)  # cancelled or rescheduled
+        return None
+
+    def _pop_due(self, now: float) -> List[str]:
+        due = []
+        while True:
+            deadline = self._next_deadline()
+            if deadline is None or deadline > now:
+                return due
+            _, invoice_id = heapq.heappop(self._heap)
+            del self._deadlines[invoice_id]
+            self.max_lag = max(self.max_lag, now - deadline)
+            due.append(invoice_id)
+
+    async def _expire(self, invoice_ids: List[str]):
+        # Imported here because invoice_service schedules through this module
+        from .invoice_service import InvoiceService
+
+        for start in range(0, len(invoice_ids), self.max_batch):
+            batch = invoice_ids[start:start + self.max_batch]
+            try:
+                async with AsyncSessionLocal() as session:
+                    expired_ids = await InvoiceService.expire_invoices(session, batch)
+                    await session.commit()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Failed to expire {len(batch)} invoices: {str(e)}")
+                retry_at = time.time() + self.retry_delay
+                for invoice_id in batch:
+                    self._deadlines[invoice_id] = retry_at
+                    heapq.heappush(self._heap, (retry_at, invoice_id))
+                continue
+
+            self.batches += 1
+            self.expired += len(expired_ids)
+            if expired_ids:
+                for callback in self._callbacks:
+                    callback(expired_ids)
+
+    async def _run(self):
+        while True:
+            deadline = self._next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            due = self._pop_due(time.time())
+            if due:
+                await self._expire(due)
+
+    async def start(self):
+        """Load every pending invoice's deadline and start expiring them on time"""
+        from .invoice_service import InvoiceService
+
+        if self._task is not None:
+            return
+        async with AsyncSessionLocal() as session:
+            for row in await InvoiceService.list_pending_invoices(session):
+                self.schedule(row.id, row.expires_at)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        deadline = self._next_deadline()
+        return {
+            "scheduled": len(self._deadlines),
+            "heap_size": len(self._heap),
+            "next_deadline": deadline,
+            "expired": self.expired,
+            "batches": self.batches,
+            "errors": self.errors,
+            "max_lag_seconds": round(self.max_lag, 3),
+        }
+
+# Global instance
+expiry_scheduler = ExpiryScheduler()
@@ -0,0 +1,162 @@
+import logging
+import os
+import time
+import httpx
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default pool settings, overridable per upstream with HTTP_<UPSTREAM>_<SETTING>
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+try:
+    import h2  # noqa: F401  (needed by httpx for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Upstreams opened with the app, with any non-default settings
+UPSTREAMS = {
+    "coingecko": {},
+    "cryptocompare": {},
+    "coinbase": {},
+    "blockstream": {},
+    "basescan": {},
+    # Webhooks fan out to many merchant hosts, so allow a larger pool
+    "webhooks": {"max_connections": 100, "max_keepalive_connections": 20},
+}
+
+def _setting(upstream: str, name: str, default, cast):
+    value = os.getenv(f"HTTP_{upstream.upper()}_{name.upper()}")
+    return cast(value) if value is not None else default
+
+class PoolStats:
+    """Request and pool wait counters for one upstream"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, wait: float):
+        self.waits += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport that measures how long requests wait for a pooled connection
+
+    The wait ends at the first connection-level trace event (TCP connect for a
+    new connection, sending headers for a reused one).
+    """
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        started = time.monotonic()
+        acquired = False
+        user_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: Dict):
+            nonlocal acquired
+            if not acquired and event_name.endswith(".started"):
+                acquired = True
+                stats.record_wait(time.monotonic() - started)
+            if user_trace is not None:
+                await user_trace(event_name, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        stats.requests += 1
+        stats.in_flight += 1
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+
+    def pool_counts(self) -> Dict[str, int]:
+        connections = self._pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {"connections": len(connections), "in_use": len(connections) - idle, "idle": idle}
+
+class HttpClientRegistry:
+    """Application-scoped httpx clients, one keep-alive connection pool per upstream"""
+
+    def __init__(self, upstreams: Optional[Dict[str, Dict]] = None):
+        self.upstreams = dict(UPSTREAMS if upstreams is None else upstreams)
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, InstrumentedTransport] = {}
+        self._stats: Dict[str, PoolStats] = {}
+
+    def _build(self, upstream: str) -> httpx.AsyncClient:
+        config = self.upstreams.get(upstream, {})
+        limits = httpx.Limits(
+            max_connections=_setting(upstream, "max_connections", config.get("max_connections", HTTP_MAX_CONNECTIONS), int),
+            max_keepalive_connections=_setting(
+                upstream, "max_keepalive_connections",
+                config.get("max_keepalive_connections", HTTP_MAX_KEEPALIVE_CONNECTIONS), int
+            ),
+            keepalive_expiry=_setting(upstream, "keepalive_expiry", config.get("keepalive_expiry", HTTP_KEEPALIVE_EXPIRY), float),
+        )
+        http2 = HTTP2_ENABLED and HTTP2_AVAILABLE
+        if HTTP2_ENABLED and not HTTP2_AVAILABLE:
+            logger.warning("HTTP2_ENABLED is set but the h2 package is not installed; using HTTP/1.1")
+
+        stats = self._stats.setdefault(upstream, PoolStats())
+        transport = InstrumentedTransport(stats, limits=limits, http2=http2)
+        self._transports[upstream] = transport
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=_setting(upstream, "timeout", config.get("timeout", HTTP_TIMEOUT), float),
+            http2=http2
+        )
+
+    def get(self, upstream: str) -> httpx.AsyncClient:
+        """Shared client for upstream, created on first use"""
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            client = self._clients[upstream] = self._build(upstream)
+        return client
+
+    def open(self):
+        """Create the clients of all configured upstreams"""
+        for upstream in self.upstreams:
+            self.get(upstream)
+
+    async def close(self):
+        """Close every client and its pooled connections"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._transports.clear()
+        for client in clients:
+            await client.aclose()
+
+    def stats(self) -> Dict:
+        """Per-upstream pool usage and wait times"""
+        result = {}
+        for upstream, stats in self._stats.items():
+            transport = self._transports.get(upstream)
+            result[upstream] = {
+                **(transport.pool_counts() if transport else {"connections": 0, "in_use": 0, "idle": 0}),
+                "requests": stats.requests,
+                "errors": stats.errors,
+                "in_flight": stats.in_flight,
+                "wait_avg_ms": round(stats.wait_total / stats.waits * 1000, 3) if stats.waits else 0.0,
+                "wait_max_ms": round(stats.wait_max * 1000, 3),
+            }
+        return result
+
+# Global instance
+http_clients = HttpClientRegistry()
@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.models import IdempotencyKey
+from ..utils.ttl_store import TTLOrderedStore
+
+# Seconds a response is replayed for retries with the same Idempotency-Key
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+# Most responses kept in memory; the oldest are evicted first
+IDEMPOTENCY_STORE_MAX_SIZE = int(os.getenv("IDEMPOTENCY_STORE_MAX_SIZE", "100000"))
+# Also keep responses in the idempotency_keys table, so retries are recognized
+# across workers and restarts
+IDEMPOTENCY_DB = os.getenv("IDEMPOTENCY_DB", "false").lower() == "true"
+# Seconds between deletions of expired idempotency_keys rows
+IDEMPOTENCY_PURGE_INTERVAL = 60
+
+# Longest Idempotency-Key header accepted
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+class IdempotencyError(ValueError):
+    """Raised when an Idempotency-Key is reused for a different request"""
+    pass
+
+class StoredResponse(NamedTuple):
+    """Response replayed byte for byte to retries of the request that produced it"""
+    fingerprint: str  # request_fingerprint() of the original request
+    status_code: int
+    body: bytes
+    expires_at: float  # unix timestamp
+
+def request_fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+def utc_naive(moment: datetime) -> datetime:
+    """Naive UTC datetime of a database datetime, comparable with datetime.utcnow()
+
+    PostgreSQL returns timezone-aware values; SQLite returns naive UTC ones.
+    """
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+class IdempotencyStore:
+    """Bounded in-memory store of responses by Idempotency-Key, optionally backed by the database
+
+    Concurrent requests with a
+    key that is still being handled wait for the first one and share its
+    outcome instead of running again. Only successful responses are stored;
+    errors reach the requests already waiting but a later retry runs again.
+    """
+
+    def __init__(
+        self,
+        ttl: float = IDEMPOTENCY_KEY_TTL,
+        max_size: int = IDEMPOTENCY_STORE_MAX_SIZE,
+        use_db: bool = IDEMPOTENCY_DB
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.use_db = use_db
+        self._responses: "TTLOrderedStore[StoredResponse]" = TTLOrderedStore(ttl, max_size)
+        self._in_flight: Dict[str, "asyncio.Future[StoredResponse]"] = {}
+        self._last_db_purge = 0.0
+        self.stored = 0
+        self.replayed = 0
+        self.coalesced = 0
+
+    async def _load(self, db: AsyncSession, key: str) -> Optional[StoredResponse]:
+        """Live stored response from the database, also cached in memory"""
+        row = await db.get(IdempotencyKey, key)
+        if row is None:
+            return None
+        remaining = (utc_naive(row.expires_at) - datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return None
+        response = StoredResponse(row.fingerprint, row.status_code, row.body, time.time() + remaining)
+        self._responses.put(key, response, response.expires_at)
+        return response
+
+    async def _purge_db(self, db: AsyncSession):
+        """Delete expired rows, at most every IDEMPOTENCY_PURGE_INTERVAL seconds"""
+        if time.monotonic() - self._last_db_purge < IDEMPOTENCY_PURGE_INTERVAL:
+            return
+        self._last_db_purge = time.monotonic()
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+
+    @staticmethod
+    def _check(response: StoredResponse, fingerprint: str) -> StoredResponse:
+        if response.fingerprint != fingerprint:
+            raise IdempotencyError("Idempotency-Key was already used for a different request")
+        return response
+
+    async def run(
+        self,
+        db: AsyncSession,
+        key: str,
+        fingerprint: str,
+        handle: Callable[[], Awaitable[Tuple[int, bytes]]]
+    ) -> Tuple[StoredResponse, bool]:
+        """Response for key, running handle() in db's transaction only if key is new
+
+        Commits db once handle() succeeds, with the stored response when the
+        database is used, so the work and its key are saved together. Returns
+        (response, replayed). Raises ValueError for an invalid key and
+        IdempotencyError if key was used with a different fingerprint.
+        """
+        if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise ValueError(f"Idempotency-Key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters")
+
+        while True:
+            response = self._responses.get(key)
+            if response is not None:
+                self.replayed += 1
+                return self._check(response, fingerprint), True
+            future = self._in_flight.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            try:
+                response = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The first request was cancelled: try again, possibly running handle() here
+                if future.cancelled():
+                    continue
+                raise
+            return self._check(response, fingerprint), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            if self.use_db:
+                response = await self._load(db, key)
+                if response is not None:
+                    self.replayed += 1
+                    future.set_result(response)
+                    return self._check(response, fingerprint), True
+
+            status_code, body = await handle()
+            response = StoredResponse(fingerprint, status_code, body, time.time() + self.ttl)
+            if self.use_db:
+                now = datetime.utcnow()
+                await self._purge_db(db)
+                # A row left over from an expired key would block the new one
+                await db.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+                )
+                db.add(IdempotencyKey(
+                    key=key,
+                    fingerprint=fingerprint,
+                    status_code=status_code,
+                    body=body,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl)
+                ))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another worker stored the key first; its work stands and ours is rolled back
+                await db.rollback()
+                response = await self._load(db, key)
+                if response is None:
+                    raise
+                self.replayed += 1
+                future.set_result(response)
+                return self._check(response, fingerprint), True
+
+            self._responses.put(key, response, response.expires_at)
+            self.stored += 1
+            future.set_result(response)
+            return response, False
+        except BaseException as e:
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    # Retrieved here, so nobody waiting is not an unhandled error
+                    future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self._responses),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "database": self.use_db,
+            "in_flight": len(self._in_flight),
+            "stored": self.stored,
+            "replayed": self.replayed,
+            "coalesced": self.coalesced,
+            "expired": self._responses.expired,
+            "evicted": self._responses.evicted,
+        }
+
+# Global instance
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+# Seconds a cached invoice view is served; writes invalidate it sooner
+INVOICE_CACHE_TTL = float(os.getenv("INVOICE_CACHE_TTL", "60"))
+# Most invoice views kept in memory; the least recently used are evicted first
+INVOICE_CACHE_MAX_SIZE = int(os.getenv("INVOICE_CACHE_MAX_SIZE", "10000"))
+
+class InvoiceCache:
+    """Bounded LRU cache of serialized invoice views with a TTL
+
+    Values are the encoded response bodies with their ETags, so a hit costs
+    neither a database query nor serialization, and a matching If-None-Match
+    can be answered from the ETag alone. Writers call invalidate() for every invoice they
+    change, both when writing and after commit; a load that overlapped an
+    invalidation of the same invoice is not cached (see token()).
+    """
+
+    def __init__(self, ttl: float = INVOICE_CACHE_TTL, max_size: int = INVOICE_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[bytes, str, float]]" = OrderedDict()  # id -> (body, etag, cached_at)
+        self._bytes = 0  # size of the cached keys, bodies and ETags
+        self._generation = 0  # bumped by every invalidation
+        # id -> generation of its last invalidation, for the most recently invalidated invoices
+        self._invalidations: "OrderedDict[str, int]" = OrderedDict()
+        self._forgotten_generation = 0  # newest generation dropped from _invalidations
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidated = 0
+
+    def get(self, invoice_id: str) -> Optional[Tuple[bytes, str]]:
+        """(body, etag) of invoice_id, or None"""
+        entry = self._entries.get(invoice_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        body, etag, cached_at = entry
+        if time.monotonic() - cached_at >= self.ttl:
+            self._remove(invoice_id)
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(invoice_id)
+        self.hits += 1
+        return body, etag
+
+    def token(self) -> int:
+        """Take before loading from the database and pass to put()"""
+        return self._generation
+
+    def put(self, invoice_id: str, body: bytes, etag: str, token: Optional[int] = None):
+        """Cache body unless invoice_id was invalidated since token was taken"""
+        if token is not None and (
+            self._invalidations.get(invoice_id, 0) > token
+            # Too old to tell whether invoice_id was invalidated since
+            or self._forgotten_generation > token
+        ):
+            return
+        if invoice_id in self._entries:
+            self._remove(invoice_id)
+        while len(self._entries) >= self.max_size:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+            self.evicted += 1
+        self._entries[invoice_id] = (body, etag, time.monotonic())
+        self._bytes += sys.getsizeof(invoice_id) + sys.getsizeof(body) + sys.getsizeof(etag)
+
+    def invalidate(self, invoice_ids: Iterable[str]):
+        """Drop the cached views of invoice_ids"""
+        self._generation += 1
+        for invoice_id in invoice_ids:
+            self._invalidations.pop(invoice_id, None)
+            self._invalidations[invoice_id] = self._generation
+            while len(self._invalidations) > self.max_size:
+                _, self._forgotten_generation = self._invalidations.popitem(last=False)
+            if invoice_id in self._entries:
+                self._remove(invoice_id)
+                self.invalidated += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, invoice_id: str):
+        body, etag, _ = self._entries.pop(invoice_id)
+        self._bytes -= sys.getsizeof(invoice_id) + sys.getsizeof(body) + sys.getsizeof(etag)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "memory_bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "invalidated": self.invalidated,
+        }
+
+# Global instance
+invoice_cache = InvoiceCache()
@@ -0,0 +1,123 @@
+import asyncio
+import os
+from typing import Dict, Iterable, Optional, Set
+from ..utils.serialization import dumps
+
+# Undelivered events a subscriber may have queued before it is evicted as too slow
+INVOICE_EVENTS_QUEUE_SIZE = int(os.getenv("INVOICE_EVENTS_QUEUE_SIZE", "100"))
+
+class Subscription:
+    """One connection's subscription to the status events of a set of invoices
+
+    Events are encoded once by the publisher and shared by every subscriber.
+    get() returns None once the subscription is closed, either by its owner or
+    because the broker evicted it for letting its queue fill up.
+    """
+
+    def __init__(self, broker: "InvoiceEventBroker", max_queued: int):
+        self._broker = broker
+        self._queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(max_queued)
+        self.invoice_ids: Set[str] = set()
+        self.closed = False
+        self.evicted = False
+
+    def add(self, invoice_ids: Iterable[str]):
+        if not self.closed:
+            self._broker._add(self, invoice_ids)
+
+    def remove(self, invoice_ids: Iterable[str]):
+        self._broker._remove(self, invoice_ids)
+
+    def put(self, message: bytes) -> bool:
+        """Queue message; False, and the subscription evicted, if the queue is full"""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.evicted = True
+            self._broker.evicted += 1
+            self.close()
+            return False
+
+    async def get(self) -> Optional[bytes]:
+        """Next queued message, or None once closed"""
+        if self.closed:
+            return None
+        return await self._queue.get()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._broker._remove(self, list(self.invoice_ids))
+        self._broker._subscriptions.discard(self)
+        # Make room for the sentinel that wakes a waiting get()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+class InvoiceEventBroker:
+    """In-process fan-out of invoice status changes to SSE and WebSocket subscribers
+
+    InvoiceService publishes after every commit that changes invoice statuses,
+    whether from the payment listeners, the expiry scheduler or the backstop
+    sweep. Publishing never waits on a subscriber: each has a bounded queue and
+    is evicted when it stops keeping up. Subscribers only see changes
+    committed by their own worker process.
+    """
+
+    def __init__(self, max_queued: int = INVOICE_EVENTS_QUEUE_SIZE):
+        self.max_queued = max_queued
+        self._subscribers: Dict[str, Set[Subscription]] = {}  # invoice_id -> subscriptions
+        self._subscriptions: Set[Subscription] = set()
+        self.published = 0
+        self.delivered = 0
+        self.evicted = 0
+
+    def subscribe(self, invoice_ids: Iterable[str] = ()) -> Subscription:
+        subscription = Subscription(self, self.max_queued)
+        self._subscriptions.add(subscription)
+        subscription.add(invoice_ids)
+        return subscription
+
+    def publish(self, invoice_id: str, event: Dict):
+        """Queue event for everything subscribed to invoice_id, encoding it once"""
+        self.published += 1
+        subscribers = self._subscribers.get(invoice_id)
+        if not subscribers:
+            return
+        message = dumps(event)
+        # Copy: evictions modify the set
+        for subscription in list(subscribers):
+            if subscription.put(message):
+                self.delivered += 1
+
+    def _add(self, subscription: Subscription, invoice_ids: Iterable[str]):
+        for invoice_id in invoice_ids:
+            subscription.invoice_ids.add(invoice_id)
+            self._subscribers.setdefault(invoice_id, set()).add(subscription)
+
+    def _remove(self, subscription: Subscription, invoice_ids: Iterable[str]):
+        for invoice_id in invoice_ids:
+            subscription.invoice_ids.discard(invoice_id)
+            subscribers = self._subscribers.get(invoice_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[invoice_id]
+
+    def stats(self) -> Dict:
+        return {
+            "connections": len(self._subscriptions),
+            "subscribed_invoices": len(self._subscribers),
+            "subscriptions": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "max_queued": self.max_queued,
+            "published": self.published,
+            "delivered": self.delivered,
+            "evicted": self.evicted,
+        }
+
+# Global instance
+invoice_events = InvoiceEventBroker()
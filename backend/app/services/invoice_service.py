@@ -1,41 +1,137 @@
-import uuid
+import base64
+import json
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from ..models.models import Invoice, Payment, User
+from sqlalchemy import Table, and_, case, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import defer
+from ..database import UPSERT_INSERTS, on_commit, read_router
+from ..models.models import Invoice, Payment, User, invoices_archive, payments_archive
+from .archive_service import ArchiveService
 from .exchange_rate import exchange_service
-from ..utils.crypto_utils import generate_btc_address, generate_ln_invoice, generate_evm_address
+from .expiry_scheduler import expiry_scheduler
+from .invoice_cache import invoice_cache
+from .invoice_events import invoice_events
+from .invoice_watcher import invoice_watcher
+from .rollup_service import RollupService
+from .quote_service import QuoteService
+from ..utils.ids import new_id
+from ..utils.crypto_utils import (
+    generate_btc_address, generate_ln_invoice, generate_evm_address,
+    generate_btc_addresses, generate_evm_addresses
+)
+
+# Inlined rather than bound so planners can match the partial index on pending invoices
+IS_PENDING = Invoice.status == literal("pending", literal_execute=True)
+
+def is_overdue(now: datetime):
+    """Pending and expired by now; an invoice expires at expires_at, not after it"""
+    return and_(IS_PENDING, Invoice.expires_at <= now)
+
+# Statuses an invoice never moves out of
+FINAL_STATUSES = ("confirmed",)
+# Statuses whose events carry a payment
+PAYMENT_STATUSES = ("detected", "confirmed")
+
+class StatusEvent(NamedTuple):
+    """A status change reported for an invoice, optionally with the paying transaction"""
+    invoice_id: str
+    status: str
+    tx_hash: Optional[str] = None
+    amount_received: Optional[str] = None
+    confirmations: int = 0
+
+class StatusChanges(NamedTuple):
+    changed: List[str]  # invoices whose status changed
+    missing: List[str]  # invoice ids that do not exist
+    transitions: List[Tuple[str, str]]  # (invoice_id, status) of each change, in order applied
+
+def encode_cursor(created_at: datetime, invoice_id: str) -> str:
+    """Opaque pagination cursor pointing just past (created_at, invoice_id)"""
+    raw = json.dumps([created_at.isoformat(), invoice_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, invoice_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(invoice_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 class InvoiceService:
     """Service for managing invoices"""
 
+    # Chain of each payment method; its asset is exchange_service.METHOD_ASSETS[method]
+    METHOD_CHAINS = {
+        "BTC_LN": "bitcoin",
+        "BTC": "bitcoin",
+        "USDC_BASE": "base"
+    }
+
+    # Bind parameters per statement; asyncpg allows 32767 and SQLite 32766
+    MAX_INSERT_PARAMS = 32000
+
+    # Longest description in listing views: what a list row shows
+    SUMMARY_DESCRIPTION_LENGTH = 80
+    # Full view for a single invoice
+    DETAIL_COLUMNS = (
+        Invoice.id, Invoice.amount_pen, Invoice.amount_crypto, Invoice.asset, Invoice.chain,
+        Invoice.method, Invoice.address_or_pr, Invoice.status, Invoice.description,
+        Invoice.expires_at, Invoice.created_at, Invoice.updated_at, Invoice.payment_url, Invoice.qr_data
+    )
+    # For Invoice objects that do not need the large text columns; reading one raises
+    # instead of lazy loading, which would need a sync round trip
+    DEFER_LARGE_COLUMNS = (
+        defer(Invoice.address_or_pr, raiseload=True),
+        defer(Invoice.description, raiseload=True),
+        defer(Invoice.qr_data, raiseload=True),
+    )
+
+    @staticmethod
+    def invalidate_cached(db: AsyncSession, invoice_ids: Sequence[str]):
+        """Drop cached views of invoices written in db's transaction, now and again at commit
+
+        The second pass catches readers that loaded the old row before the commit.
+        """
+        if invoice_ids:
+            invoice_ids = list(invoice_ids)
+            invoice_cache.invalidate(invoice_ids)
+            on_commit(db, lambda: invoice_cache.invalidate(invoice_ids))
+
+    @staticmethod
+    def method_asset_and_chain(method: str) -> Tuple[str, str]:
+        """(asset, chain) of a payment method; ValueError if it is not supported"""
+        if method not in InvoiceService.METHOD_CHAINS or method not in exchange_service.METHOD_ASSETS:
+            raise ValueError(f"Unsupported method: {method}")
+        return exchange_service.METHOD_ASSETS[method], InvoiceService.METHOD_CHAINS[method]
+
     @staticmethod
     async def create_invoice(
         db: AsyncSession,
         user_id: int,
-        amount_pen: float,
-        method: str,
+        amount_pen: Optional[float],
+        method: Optional[str],
         description: Optional[str] = None,
-        expiry_minutes: int = 15
+        expiry_minutes: int = 15,
+        quote_id: Optional[str] = None
     ) -> Invoice:
-        """Create a new invoice"""
-
-        # Generate unique invoice ID
-        invoice_id = f"inv_{uuid.uuid4().hex[:12]}"
+        """Create a new invoice, priced at a locked quote's rate if quote_id is given"""
 
-        # Convert PEN to crypto
-        amount_crypto = await exchange_service.convert_pen_to_crypto(amount_pen, method)
+        # Generate unique, time-ordered invoice ID
+        invoice_id = new_id("inv")
 
-        # Determine asset and chain
-        if method == "BTC_LN" or method == "BTC":
-            asset = "BTC"
-            chain = "bitcoin"
-        elif method == "USDC_BASE":
-            asset = "USDC"
-            chain = "base"
-        else:
-            raise ValueError(f"Unsupported method: {method}")
+        # Convert PEN to crypto (a quote already carries the amount, so no rate lookup)
+        if quote_id:
+            quote = QuoteService.get_quote(quote_id, amount_pen, method)
+            amount_pen, method, amount_crypto = quote.amount_pen, quote.method, quote.amount_crypto
+        elif amount_pen is None or method is None:
+            raise ValueError("amount_pen and method are required without a quote_id")
+        asset, chain = InvoiceService.method_asset_and_chain(method)
+        if not quote_id:
+            amount_crypto = await exchange_service.convert_pen_to_crypto(amount_pen, method)
 
         # Generate address or payment request
         if method == "BTC_LN":
@@ -48,7 +144,8 @@ class InvoiceService:
             raise ValueError(f"Unsupported method: {method}")
 
         # Calculate expiry time
-        expires_at = datetime.utcnow() + timedelta(minutes=expiry_minutes)
+        now = datetime.utcnow()
+        expires_at = now + timedelta(minutes=expiry_minutes)
 
         # Create payment URL
         payment_url = f"https://payo.app/pay/{invoice_id}"
@@ -70,22 +167,121 @@ class InvoiceService:
             description=description,
             expires_at=expires_at,
             payment_url=payment_url,
-            qr_data=qr_data
+            qr_data=qr_data,
+            # Set here rather than by the server default so keyset cursors compare exactly
+            created_at=now,
+            updated_at=now
         )
 
         db.add(invoice)
         await db.flush()
         await db.refresh(invoice)
+        await RollupService.record(db, [(user_id, now, method, amount_pen, None, "pending")])
+
+        # Consume the quote only once the invoice is written, so a failed insert can retry it
+        if quote_id:
+            QuoteService.consume_quote(quote_id)
+
+        on_commit(db, lambda: expiry_scheduler.schedule(invoice_id, expires_at))
+        # The creator's listings read from the primary until the replica has the invoice
+        on_commit(db, lambda: read_router.wrote(user_id))
 
         return invoice
 
     @staticmethod
-    async def get_invoice(db: AsyncSession, invoice_id: str) -> Optional[Invoice]:
-        """Get invoice by ID with payment information"""
-        result = await db.execute(
-            select(Invoice).where(Invoice.id == invoice_id)
+    async def create_invoices(
+        db: AsyncSession,
+        user_id: int,
+        items: Sequence[Tuple[float, str, Optional[str]]],
+        expiry_minutes: int = 15
+    ) -> List[Dict]:
+        """Create many invoices from (amount_pen, method, description) items
+
+        Each asset's rate is resolved once and all rows go in through one
+        multi-row INSERT in the caller's transaction. Returns the inserted rows.
+        """
+        for _, method, _ in items:
+            InvoiceService.method_asset_and_chain(method)
+
+        # Convert PEN to crypto with one rate lookup per asset
+        amounts = await exchange_service.convert_many((amount_pen, method) for amount_pen, method, _ in items)
+
+        now = datetime.utcnow()
+        expires_at = now + timedelta(minutes=expiry_minutes)
+        invoice_ids = [new_id("inv") for _ in items]
+        btc_addresses = iter(generate_btc_addresses(sum(1 for _, method, _ in items if method == "BTC")))
+        evm_addresses = iter(generate_evm_addresses(sum(1 for _, method, _ in items if method == "USDC_BASE")))
+
+        rows = []
+        for invoice_id, (amount_pen, method, description), amount_crypto in zip(invoice_ids, items, amounts):
+            asset, chain = InvoiceService.method_asset_and_chain(method)
+            if method == "BTC_LN":
+                address_or_pr = generate_ln_invoice(amount_crypto, f"Payo Invoice {invoice_id}")
+            elif method == "BTC":
+                address_or_pr = next(btc_addresses)
+            else:
+                address_or_pr = next(evm_addresses)
+            rows.append({
+                "id": invoice_id,
+                "user_id": user_id,
+                "method": method,
+                "amount_pen": amount_pen,
+                "amount_crypto": amount_crypto,
+                "asset": asset,
+                "chain": chain,
+                "address_or_pr": address_or_pr,
+                "status": "pending",
+                "description": description,
+                "expires_at": expires_at,
+                "payment_url": f"https://payo.app/pay/{invoice_id}",
+                "qr_data": f"payo:{invoice_id}",
+                "created_at": now,
+                "updated_at": now
+            })
+
+        # Rows carry every column, so no RETURNING or refresh round trip is needed.
+        # Chunks keep each multi-row INSERT under the driver's bind parameter limit.
+        chunk_size = InvoiceService.MAX_INSERT_PARAMS // len(rows[0]) if rows else 1
+        for start in range(0, len(rows), chunk_size):
+            await db.execute(insert(Invoice).values(rows[start:start + chunk_size]))
+        await RollupService.record(
+            db, [(user_id, now, row["method"], row["amount_pen"], None, "pending") for row in rows]
+        )
+
+        def schedule_expiry():
+            for invoice_id in invoice_ids:
+                expiry_scheduler.schedule(invoice_id, expires_at)
+        on_commit(db, schedule_expiry)
+        on_commit(db, lambda: read_router.wrote(user_id))
+        return rows
+
+    @staticmethod
+    def summary_columns(fields: Sequence[str]) -> tuple:
+        """Invoice columns for a listing view's fields, in order, with the description cut short"""
+        return tuple(
+            func.substr(Invoice.description, 1, InvoiceService.SUMMARY_DESCRIPTION_LENGTH).label(field)
+            if field == "description" else getattr(Invoice, field)
+            for field in fields
         )
-        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def get_invoice(db: AsyncSession, invoice_id: str, columns: Optional[Sequence] = None):
+        """Get invoice by ID, falling back to the archive
+
+        Returns an Invoice (detached and read-only if archived), or a plain row
+        of just the given columns, such as DETAIL_COLUMNS.
+        """
+        if columns:
+            result = await db.execute(select(*columns).where(Invoice.id == invoice_id))
+            invoice = result.first()
+        else:
+            result = await db.execute(
+                select(Invoice).where(Invoice.id == invoice_id)
+            )
+            invoice = result.scalar_one_or_none()
+        if invoice is None:
+            invoice = await ArchiveService.get_archived_invoice(db, invoice_id, columns)
+        return invoice
 
     @staticmethod
     async def list_invoices(
@@ -94,20 +290,128 @@ class InvoiceService:
         status: Optional[str] = None,
         method: Optional[str] = None,
         limit: int = 50,
-        offset: int = 0
-    ) -> List[Invoice]:
-        """List invoices for a user with optional filters"""
-        query = select(Invoice).where(Invoice.user_id == user_id)
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        columns: Optional[Sequence] = None
+    ) -> List:
+        """List invoices for a user with optional filters, newest first
+
+        With a cursor (see encode_cursor) the page starts right after the row it
+        points to, so cost does not grow with page depth and offset is ignored.
+        Returns plain rows of the given columns (such as summary_columns()), or
+        Invoice objects with the large text columns deferred.
+        """
+        if columns:
+            query = select(*columns)
+        else:
+            query = select(Invoice).options(*InvoiceService.DEFER_LARGE_COLUMNS)
+        query = query.where(Invoice.user_id == user_id)
 
         if status:
             query = query.where(Invoice.status == status)
         if method:
             query = query.where(Invoice.method == method)
 
-        query = query.order_by(Invoice.created_at.desc()).limit(limit).offset(offset)
+        if cursor:
+            created_at, invoice_id = decode_cursor(cursor)
+            query = query.where(tuple_(Invoice.created_at, Invoice.id) < tuple_(created_at, invoice_id))
+        else:
+            query = query.offset(offset)
+
+        query = query.order_by(Invoice.created_at.desc(), Invoice.id.desc()).limit(limit)
 
         result = await db.execute(query)
-        return result.scalars().all()
+        return result.all() if columns else result.scalars().all()
+
+    # Invoice and payment columns of each export row, in output order
+    EXPORT_INVOICE_COLUMNS = (
+        "id", "method", "amount_pen", "amount_crypto", "asset", "chain", "address_or_pr",
+        "status", "description", "created_at", "updated_at", "expires_at"
+    )
+    EXPORT_PAYMENT_COLUMNS = ("tx_hash", "amount_received", "confirmations", "detected_at", "confirmed_at")
+    EXPORT_FIELDS = EXPORT_INVOICE_COLUMNS + (
+        "tx_hash", "amount_received", "confirmations", "payment_detected_at", "payment_confirmed_at"
+    )
+
+    # Rows fetched from the server-side cursor at a time
+    EXPORT_BATCH_SIZE = 1000
+
+    @staticmethod
+    def _export_query(invoices: Table, payments: Table, user_id: int, status: Optional[str], method: Optional[str]):
+        query = (
+            select(
+                *[invoices.c[name] for name in InvoiceService.EXPORT_INVOICE_COLUMNS],
+                *[payments.c[name] for name in InvoiceService.EXPORT_PAYMENT_COLUMNS]
+            )
+            .select_from(invoices.outerjoin(payments, payments.c.invoice_id == invoices.c.id))
+            .where(invoices.c.user_id == user_id)
+        )
+        if status:
+            query = query.where(invoices.c.status == status)
+        if method:
+            query = query.where(invoices.c.method == method)
+        return query.order_by(invoices.c.created_at, invoices.c.id).execution_options(
+            yield_per=InvoiceService.EXPORT_BATCH_SIZE
+        )
+
+    @staticmethod
+    async def stream_export(
+        db: AsyncSession,
+        user_id: int,
+        status: Optional[str] = None,
+        method: Optional[str] = None
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Yield batches of export rows (see EXPORT_FIELDS) for a user's invoices
+
+        Archived invoices come first, then live ones, each oldest first. Rows come
+        from server-side cursors, so memory use does not depend on the number of
+        invoices. An invoice with several payments gets one row per payment; one
+        without payments gets a single row with empty payment columns.
+        """
+        for invoices, payments in ((invoices_archive, payments_archive), (Invoice.__table__, Payment.__table__)):
+            result = await db.stream(InvoiceService._export_query(invoices, payments, user_id, status, method))
+            async for rows in result.partitions():
+                yield rows
+
+    @staticmethod
+    async def _transition(db: AsyncSession, status: str, now: datetime, *conditions) -> List[str]:
+        """Move invoices matching conditions to status and update the rollups; returns their IDs
+
+        SET expressions see the row as it was, so previous_status gets the old
+        status and RETURNING hands it back without a separate read. Once the
+        change commits, long-polls are woken and event subscribers notified.
+        """
+        result = await db.execute(
+            update(Invoice)
+            .where(*conditions)
+            .values(previous_status=Invoice.status, status=status, updated_at=now)
+            .returning(
+                Invoice.id, Invoice.user_id, Invoice.created_at, Invoice.method,
+                Invoice.amount_pen, Invoice.previous_status
+            )
+        )
+        rows = result.all()
+        await RollupService.record(db, [
+            (row.user_id, row.created_at, row.method, row.amount_pen, row.previous_status, status)
+            for row in rows
+        ])
+        changes = [(row.id, row.previous_status) for row in rows]
+        if changes:
+            on_commit(db, lambda: InvoiceService._notify_status_changes(changes, status, now))
+        return [invoice_id for invoice_id, _ in changes]
+
+    @staticmethod
+    def _notify_status_changes(changes: Sequence[Tuple[str, str]], status: str, now: datetime):
+        """Wake long-polls on, and publish events for, committed (invoice_id, previous_status) changes"""
+        invoice_watcher.notify(invoice_id for invoice_id, _ in changes)
+        for invoice_id, previous_status in changes:
+            invoice_events.publish(invoice_id, {
+                "type": "invoice.updated",
+                "invoice_id": invoice_id,
+                "status": status,
+                "previous_status": previous_status,
+                "updated_at": now,
+            })
 
     @staticmethod
     async def update_invoice_status(
@@ -118,54 +422,134 @@ class InvoiceService:
         amount_received: Optional[str] = None,
         confirmations: int = 0
     ) -> bool:
-        """Update invoice status and create payment record if needed"""
+        """Update invoice status and record the payment if needed; False if the invoice does not exist
 
-        # Get invoice
-        invoice = await InvoiceService.get_invoice(db, invoice_id)
-        if not invoice:
-            return False
+        Repeating an event that was already applied changes nothing.
+        """
+        event = StatusEvent(invoice_id, status, tx_hash, amount_received, confirmations)
+        changes = await InvoiceService.apply_status_events(db, [event])
+        return invoice_id not in changes.missing
 
-        # Update invoice status
-        await db.execute(
-            update(Invoice)
-            .where(Invoice.id == invoice_id)
-            .values(status=status, updated_at=datetime.utcnow())
-        )
+    @staticmethod
+    async def apply_status_events(db: AsyncSession, events: Sequence[StatusEvent]) -> StatusChanges:
+        """Apply a burst of status events in the caller's transaction
+
+        Each target status costs one conditional UPDATE ... RETURNING, and all
+        payments go in through one upsert keyed by (tx_hash, invoice_id), so a
+        transaction reported again is a no-op. Invoices never leave a final
+        status.
+        """
+        if not events:
+            return StatusChanges([], [], [])
+        now = datetime.utcnow()
+
+        # Final statuses go last so a burst holding detected and confirmed ends confirmed
+        by_status: Dict[str, List[str]] = {}
+        for event in sorted(events, key=lambda e: e.status in FINAL_STATUSES):
+            by_status.setdefault(event.status, []).append(event.invoice_id)
 
-        # Create payment record if this is a payment detection/confirmation
-        if tx_hash and amount_received and status in ["detected", "confirmed"]:
-            payment = Payment(
-                invoice_id=invoice_id,
-                tx_hash=tx_hash,
-                amount_received=amount_received,
-                confirmations=confirmations,
-                detected_at=datetime.utcnow(),
-                confirmed_at=datetime.utcnow() if status == "confirmed" else None
+        changed: List[str] = []
+        settled: List[str] = []
+        transitions: List[Tuple[str, str]] = []
+        for status, invoice_ids in by_status.items():
+            updated_ids = await InvoiceService._transition(
+                db, status, now,
+                Invoice.id.in_(set(invoice_ids)),
+                Invoice.status != status,
+                Invoice.status.notin_(FINAL_STATUSES)
             )
-            db.add(payment)
+            changed.extend(updated_ids)
+            transitions.extend((invoice_id, status) for invoice_id in updated_ids)
+            if status != "pending":
+                settled.extend(updated_ids)
 
-        await db.flush()
-        return True
+        # Only events that changed nothing need telling apart from unknown invoices
+        unchanged_ids = {event.invoice_id for event in events} - set(changed)
+        missing = set()
+        if unchanged_ids:
+            result = await db.execute(select(Invoice.id).where(Invoice.id.in_(unchanged_ids)))
+            missing = unchanged_ids - set(result.scalars().all())
+
+        payments: Dict[Tuple[str, str], Dict] = {}
+        for event in events:
+            if not (event.tx_hash and event.amount_received and event.status in PAYMENT_STATUSES):
+                continue
+            if event.invoice_id in missing:
+                continue
+            confirmed_at = now if event.status == "confirmed" else None
+            key = (event.tx_hash, event.invoice_id)
+            if key in payments:
+                # One row per key, since an upsert cannot touch the same row twice
+                payment = payments[key]
+                payment["confirmations"] = max(payment["confirmations"], event.confirmations)
+                payment["confirmed_at"] = payment["confirmed_at"] or confirmed_at
+            else:
+                payments[key] = {
+                    "invoice_id": event.invoice_id,
+                    "tx_hash": event.tx_hash,
+                    "amount_received": event.amount_received,
+                    "confirmations": event.confirmations,
+                    "detected_at": now,
+                    "confirmed_at": confirmed_at
+                }
+
+        if payments:
+            stmt = UPSERT_INSERTS[db.get_bind().dialect.name](Payment).values(list(payments.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Payment.tx_hash, Payment.invoice_id],
+                set_={
+                    # The where clause also matches on confirmed_at alone; never lower the count.
+                    # case() rather than max()/greatest(), which differ between SQLite and PostgreSQL
+                    "confirmations": case(
+                        (stmt.excluded.confirmations > Payment.confirmations, stmt.excluded.confirmations),
+                        else_=Payment.confirmations
+                    ),
+                    "confirmed_at": func.coalesce(Payment.confirmed_at, stmt.excluded.confirmed_at)
+                },
+                where=or_(
+                    stmt.excluded.confirmations > Payment.confirmations,
+                    and_(Payment.confirmed_at.is_(None), stmt.excluded.confirmed_at.isnot(None))
+                )
+            )
+            await db.execute(stmt)
+
+        changed = list(dict.fromkeys(changed))
+        InvoiceService.invalidate_cached(db, changed)
+        if settled:
+            on_commit(db, lambda: expiry_scheduler.cancel(settled))
+        return StatusChanges(changed, sorted(missing), transitions)
 
     @staticmethod
-    async def check_expired_invoices(db: AsyncSession) -> List[str]:
-        """Check for expired invoices and return their IDs"""
-        now = datetime.utcnow()
+    async def list_pending_invoices(db: AsyncSession) -> List[Row]:
+        """(id, address_or_pr, method, expires_at) of every pending invoice"""
         result = await db.execute(
-            select(Invoice.id).where(
-                Invoice.status == "pending",
-                Invoice.expires_at < now
-            )
+            select(Invoice.id, Invoice.address_or_pr, Invoice.method, Invoice.expires_at).where(IS_PENDING)
         )
-        expired_ids = result.scalars().all()
-
-        # Update expired invoices
-        if expired_ids:
-            await db.execute(
-                update(Invoice)
-                .where(Invoice.id.in_(expired_ids))
-                .values(status="expired", updated_at=now)
-            )
-            await db.flush()
+        return result.all()
+
+    @staticmethod
+    async def expire_invoices(db: AsyncSession, invoice_ids: Sequence[str]) -> List[str]:
+        """Expire the given invoices that are still pending and past expiry; returns their IDs"""
+        now = datetime.utcnow()
+        expired_ids = await InvoiceService._transition(
+            db, "expired", now,
+            Invoice.id.in_(invoice_ids),
+            is_overdue(now)
+        )
+        InvoiceService.invalidate_cached(db, expired_ids)
+        return expired_ids
+
+    @staticmethod
+    async def check_expired_invoices(db: AsyncSession) -> List[str]:
+        """Expire every pending invoice past expiry and return their IDs
 
+        The expiry scheduler handles invoices on time; this sweep catches any it
+        never saw, such as those created by another process.
+        """
+        now = datetime.utcnow()
+        expired_ids = await InvoiceService._transition(
+            db, "expired", now,
+            is_overdue(now)
+        )
+        InvoiceService.invalidate_cached(db, expired_ids)
         return expired_ids
@@ -0,0 +1,54 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Set
+
+class InvoiceWatcher:
+    """Wakes requests long-polling for an invoice's status to change
+
+    InvoiceService notifies after every commit that changes invoice statuses,
+    whether from the payment listeners, the expiry scheduler or the backstop
+    sweep. Waiters are per process: with several workers each one only sees
+    the changes its own listeners commit.
+    """
+
+    def __init__(self):
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+        self.notified = 0
+        self.woken = 0
+
+    @contextmanager
+    def watch(self, invoice_id: str) -> Iterator[asyncio.Event]:
+        """Event set on the next status change of invoice_id
+
+        Enter before reading the invoice, so a change committed between the
+        read and the wait is not missed.
+        """
+        event = asyncio.Event()
+        self._waiters.setdefault(invoice_id, set()).add(event)
+        try:
+            yield event
+        finally:
+            waiters = self._waiters.get(invoice_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[invoice_id]
+
+    def notify(self, invoice_ids: Iterable[str]):
+        """Wake everything watching invoice_ids"""
+        for invoice_id in invoice_ids:
+            self.notified += 1
+            for event in self._waiters.get(invoice_id, ()):
+                event.set()
+                self.woken += 1
+
+    def stats(self) -> Dict:
+        return {
+            "watched_invoices": len(self._waiters),
+            "waiters": sum(len(waiters) for waiters in self._waiters.values()),
+            "notified": self.notified,
+            "woken": self.woken,
+        }
+
+# Global instance
+invoice_watcher = InvoiceWatcher()
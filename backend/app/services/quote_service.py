@@ -0,0 +1,108 @@
+import os
+import time
+import uuid
+from decimal import Decimal
+from typing import Dict, NamedTuple, Optional
+from .exchange_rate import exchange_service
+from ..utils.ttl_store import TTLOrderedStore
+
+# Seconds a quoted rate stays valid for invoice creation
+QUOTE_TTL = float(os.getenv("QUOTE_TTL_SECONDS", "120"))
+# Most quotes kept in memory; the oldest are evicted first
+QUOTE_STORE_MAX_SIZE = int(os.getenv("QUOTE_STORE_MAX_SIZE", "100000"))
+
+class QuoteError(ValueError):
+    """Raised when a quote is unknown, expired or does not match the invoice"""
+    pass
+
+class Quote(NamedTuple):
+    """A PEN amount priced in crypto at a locked rate"""
+    id: str
+    amount_pen: float
+    method: str
+    asset: str
+    rate: Decimal
+    amount_crypto: str
+    created_at: float  # unix timestamp
+    expires_at: float  # unix timestamp
+
+class QuoteStore:
+    """Bounded in-memory store of quotes that expire after a fixed TTL"""
+
+    def __init__(self, ttl: float = QUOTE_TTL, max_size: int = QUOTE_STORE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._quotes: "TTLOrderedStore[Quote]" = TTLOrderedStore(ttl, max_size)
+        self.created = 0
+        self.redeemed = 0
+
+    def put(self, quote: Quote):
+        self._quotes.put(quote.id, quote, quote.expires_at)
+        self.created += 1
+
+    def get(self, quote_id: str) -> Optional[Quote]:
+        """Return a live quote without consuming it"""
+        return self._quotes.get(quote_id)
+
+    def take(self, quote_id: str) -> Optional[Quote]:
+        """Remove and return a live quote so it can back only one invoice"""
+        quote = self._quotes.pop(quote_id)
+        if quote is not None:
+            self.redeemed += 1
+        return quote
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self._quotes),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "created": self.created,
+            "redeemed": self.redeemed,
+            "expired": self._quotes.expired,
+            "evicted": self._quotes.evicted,
+        }
+
+# Global instance
+quote_store = QuoteStore()
+
+class QuoteService:
+    """Service for issuing and redeeming rate quotes"""
+
+    @staticmethod
+    async def create_quote(amount_pen: float, method: str) -> Quote:
+        """Price amount_pen in the method's asset and lock the rate for QUOTE_TTL seconds"""
+        rates = await exchange_service.pricing_rates([method])
+        asset = exchange_service.METHOD_ASSETS[method]
+        amount_crypto = (await exchange_service.convert_many([(amount_pen, method)], rates=rates))[0]
+
+        now = time.time()
+        quote = Quote(
+            id=f"qt_{uuid.uuid4().hex[:16]}",
+            amount_pen=amount_pen,
+            method=method,
+            asset=asset,
+            rate=rates[asset],
+            amount_crypto=amount_crypto,
+            created_at=now,
+            expires_at=now + quote_store.ttl
+        )
+        quote_store.put(quote)
+        return quote
+
+    @staticmethod
+    def get_quote(quote_id: str, amount_pen: Optional[float] = None, method: Optional[str] = None) -> Quote:
+        """Look up a live quote, checking it matches any amount/method given"""
+        quote = quote_store.get(quote_id)
+        if quote is None:
+            raise QuoteError(f"Quote {quote_id} not found or expired")
+        if amount_pen is not None and amount_pen != quote.amount_pen:
+            raise QuoteError(f"Quote {quote_id} is for {quote.amount_pen} PEN, not {amount_pen}")
+        if method is not None and method != quote.method:
+            raise QuoteError(f"Quote {quote_id} is for {quote.method}, not {method}")
+        return quote
+
+    @staticmethod
+    def consume_quote(quote_id: str):
+        """Mark a quote as used so it backs only one invoice"""
+        if quote_store.take(quote_id) is None:
+            raise QuoteError(f"Quote {quote_id} was already used or has expired")
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import math
+import os
+import struct
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Days of rates kept per asset
+RATE_HISTORY_DAYS = float(os.getenv("RATE_HISTORY_DAYS", "30"))
+# Samples kept per asset; 0 sizes it to hold RATE_HISTORY_DAYS at the sample interval
+RATE_HISTORY_CAPACITY = int(os.getenv("RATE_HISTORY_CAPACITY", "0"))
+RATE_HISTORY_PATH = os.getenv("RATE_HISTORY_PATH", "data/rate_history.bin")
+# Seconds between snapshots of the history to disk
+RATE_HISTORY_PERSIST_INTERVAL = float(os.getenv("RATE_HISTORY_PERSIST_INTERVAL", "300"))
+
+FILE_MAGIC = b"PRH1"
+
+class RateSeries:
+    """Fixed-capacity ring buffer of (timestamp, rate) samples for one asset
+
+    Samples are stored in two flat float arrays (16 bytes per sample) and are
+    expected to arrive in timestamp order, so ranges are found by binary search.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.rates = array("d", bytes(8 * capacity))
+        self.start = 0  # physical index of the oldest sample
+        self.size = 0
+
+    def append(self, timestamp: float, rate: float):
+        if self.size and timestamp < self.timestamps[self._physical(self.size - 1)]:
+            # Keep the buffer sorted; clock steps backwards are clamped
+            timestamp = self.timestamps[self._physical(self.size - 1)]
+        if self.size < self.capacity:
+            index = self._physical(self.size)
+            self.size += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.timestamps[index] = timestamp
+        self.rates[index] = rate
+
+    def _physical(self, logical: int) -> int:
+        return (self.start + logical) % self.capacity
+
+    def bisect(self, timestamp: float) -> int:
+        """Logical index of the first sample at or after timestamp"""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamps[self._physical(mid)] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _slices(self, lo: int, hi: int) -> List[Tuple[int, int]]:
+        """Physical [start, end) ranges covering logical [lo, hi)"""
+        if lo >= hi:
+            return []
+        start, end = self._physical(lo), self._physical(hi - 1) + 1
+        if start < end:
+            return [(start, end)]
+        return [(start, self.capacity), (0, end)]
+
+    def rates_between(self, lo: int, hi: int) -> List[array]:
+        return [self.rates[start:end] for start, end in self._slices(lo, hi)]
+
+    def chronological(self) -> Tuple[array, array]:
+        timestamps, rates = array("d"), array("d")
+        for start, end in self._slices(0, self.size):
+            timestamps.extend(self.timestamps[start:end])
+            rates.extend(self.rates[start:end])
+        return timestamps, rates
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        if not self.size:
+            return None
+        index = self._physical(self.size - 1)
+        return self.timestamps[index], self.rates[index]
+
+class RateHistory:
+    """In-memory rate history per asset with server-side downsampling and disk persistence
+
+    sample_interval is the seconds between samples of one asset, which sizes
+    the buffers when capacity is 0.
+    """
+
+    def __init__(
+        self,
+        sample_interval: float,
+        capacity: int = RATE_HISTORY_CAPACITY,
+        path: Optional[str] = RATE_HISTORY_PATH
+    ):
+        self.capacity = capacity or math.ceil(RATE_HISTORY_DAYS * 86400 / sample_interval)
+        self.path = Path(path) if path else None
+        self.series: Dict[str, RateSeries] = {}
+        self._persist_task: Optional[asyncio.Task] = None
+
+    def record(self, asset: str, rate: float, timestamp: Optional[float] = None):
+        """Append a sample for asset"""
+        series = self.series.get(asset)
+        if series is None:
+            series = self.series[asset] = RateSeries(self.capacity)
+        series.append(time.time() if timestamp is None else timestamp, float(rate))
+
+    def query(self, asset: str, since: float, until: float, buckets: int) -> List[Dict]:
+        """Downsample samples in [since, until) into equal-width min/max/avg buckets
+
+        Empty buckets are omitted.
+        """
+        series = self.series.get(asset)
+        if series is None or until <= since or buckets < 1:
+            return []
+
+        width = (until - since) / buckets
+        points = []
+        lo = series.bisect(since)
+        for bucket in range(buckets):
+            bucket_start = since + bucket * width
+            hi = series.bisect(bucket_start + width) if bucket < buckets - 1 else series.bisect(until)
+            if hi > lo:
+                chunks = series.rates_between(lo, hi)
+                points.append({
+                    "t": bucket_start,
+                    "min": min(min(chunk) for chunk in chunks),
+                    "max": max(max(chunk) for chunk in chunks),
+                    "avg": sum(sum(chunk) for chunk in chunks) / (hi - lo),
+                    "count": hi - lo,
+                })
+            lo = hi
+        return points
+
+    def stats(self) -> Dict:
+        return {
+            asset: {
+                "samples": series.size,
+                "capacity": series.capacity,
+                "oldest": series.timestamps[series.start] if series.size else None,
+                "latest": series.latest()[0] if series.size else None,
+            }
+            for asset, series in self.series.items()
+        }
+
+    def _copy(self) -> List[Tuple[str, array, array]]:
+        """Chronological copy of every series, taken on the event loop thread"""
+        return [(asset, *series.chronological()) for asset, series in self.series.items()]
+
+    def _write(self, data: List[Tuple[str, array, array]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(FILE_MAGIC + struct.pack("<I", len(data)))
+            for asset, timestamps, rates in data:
+                name = asset.encode()
+                f.write(struct.pack("<H", len(name)) + name + struct.pack("<Q", len(timestamps)))
+                timestamps.tofile(f)
+                rates.tofile(f)
+        os.replace(tmp_path, self.path)
+
+    def save(self):
+        """Write all samples to disk atomically"""
+        if self.path is not None:
+            self._write(self._copy())
+
+    def load(self):
+        """Load samples previously written by save(), if any"""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "rb") as f:
+                if f.read(4) != FILE_MAGIC:
+                    raise ValueError("not a rate history file")
+                (count,) = struct.unpack("<I", f.read(4))
+                for _ in range(count):
+                    (name_length,) = struct.unpack("<H", f.read(2))
+                    asset = f.read(name_length).decode()
+                    (size,) = struct.unpack("<Q", f.read(8))
+                    timestamps, rates = array("d"), array("d")
+                    timestamps.fromfile(f, size)
+                    rates.fromfile(f, size)
+                    # Only the newest samples fit if capacity shrank
+                    for timestamp, rate in zip(timestamps[-self.capacity:], rates[-self.capacity:]):
+                        self.record(asset, rate, timestamp)
+        except (OSError, ValueError, EOFError, struct.error) as e:
+            logger.error(f"Could not load rate history from {self.path}: {str(e)}")
+
+    async def _run_persistence(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            if self.path is None:
+                continue
+            try:
+                # Copy in the loop, write in a thread so disk I/O never blocks requests
+                await asyncio.get_running_loop().run_in_executor(None, self._write, self._copy())
+            except Exception as e:
+                logger.error(f"Could not persist rate history: {str(e)}")
+
+    def start_persistence(self, interval: float = RATE_HISTORY_PERSIST_INTERVAL):
+        """Load history from disk and save it periodically"""
+        self.load()
+        if self._persist_task is None:
+            self._persist_task = asyncio.create_task(self._run_persistence(interval))
+
+    async def stop_persistence(self):
+        """Stop periodic saving and write a final snapshot"""
+        if self._persist_task is not None:
+            self._persist_task.cancel()
+            try:
+                await self._persist_task
+            except asyncio.CancelledError:
+                pass
+            self._persist_task = None
+        self.save()
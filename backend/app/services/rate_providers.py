@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from statistics import median
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from .http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated provider names, in initial preference order
+RATE_PROVIDERS = os.getenv("EXCHANGE_RATE_PROVIDERS", "coingecko,cryptocompare,coinbase")
+# Rates that must agree before a result is returned
+RATE_QUORUM = int(os.getenv("EXCHANGE_RATE_QUORUM", "2"))
+# Seconds without an answer before an extra provider is queried
+RATE_HEDGE_DELAY = float(os.getenv("EXCHANGE_RATE_HEDGE_DELAY", "0.3"))
+# Overall deadline for one aggregated fetch in seconds
+RATE_FETCH_TIMEOUT = float(os.getenv("EXCHANGE_RATE_FETCH_TIMEOUT", "3.0"))
+# Relative distance from the median beyond which a rate is discarded as an outlier
+RATE_MAX_DEVIATION = float(os.getenv("EXCHANGE_RATE_MAX_DEVIATION", "0.02"))
+
+class RateProviderError(Exception):
+    """Raised when no provider returned a usable rate"""
+    pass
+
+class RateProvider(ABC):
+    """Abstract base class for exchange rate sources
+
+    Providers return the price of one unit of the asset in PEN.
+    """
+
+    name = "provider"
+
+    @abstractmethod
+    async def fetch_rate(self, asset: str) -> Decimal:
+        """Fetch asset/PEN rate, raising on any failure"""
+        pass
+
+class CoinGeckoProvider(RateProvider):
+    """CoinGecko simple price API"""
+
+    name = "coingecko"
+    API = "https://api.coingecko.com/api/v3"
+    COIN_IDS = {
+        "BTC": "bitcoin",
+        "USDC": "usd-coin"
+    }
+
+    async def fetch_rate(self, asset: str) -> Decimal:
+        coin_id = self.COIN_IDS[asset]
+        response = await http_clients.get(self.name).get(
+            f"{self.API}/simple/price",
+            params={"ids": coin_id, "vs_currencies": "pen"}
+        )
+        response.raise_for_status()
+        return Decimal(str(response.json()[coin_id]["pen"]))
+
+class CryptoCompareProvider(RateProvider):
+    """CryptoCompare single price API"""
+
+    name = "cryptocompare"
+    API = "https://min-api.cryptocompare.com/data/price"
+
+    async def fetch_rate(self, asset: str) -> Decimal:
+        response = await http_clients.get(self.name).get(self.API, params={"fsym": asset, "tsyms": "PEN"})
+        response.raise_for_status()
+        return Decimal(str(response.json()["PEN"]))
+
+class CoinbaseProvider(RateProvider):
+    """Coinbase exchange rates API"""
+
+    name = "coinbase"
+    API = "https://api.coinbase.com/v2/exchange-rates"
+
+    async def fetch_rate(self, asset: str) -> Decimal:
+        response = await http_clients.get(self.name).get(self.API, params={"currency": asset})
+        response.raise_for_status()
+        return Decimal(str(response.json()["data"]["rates"]["PEN"]))
+
+class StaticRateProvider(RateProvider):
+    """Local provider returning fixed rates, for offline development and tests"""
+
+    name = "static"
+    DEFAULT_RATES = {
+        "BTC": Decimal("385000"),
+        "USDC": Decimal("3.70")
+    }
+
+    def __init__(self, rates: Optional[Dict[str, Decimal]] = None, name: Optional[str] = None):
+        self.rates = dict(rates or self.DEFAULT_RATES)
+        if name:
+            self.name = name
+
+    async def fetch_rate(self, asset: str) -> Decimal:
+        return self.rates[asset]
+
+class SimulatedRateProvider(StaticRateProvider):
+    """Local provider with configurable latency, jitter, skew and failure rate
+
+    Useful for exercising hedging and outlier rejection without network access.
+    """
+
+    name = "simulated"
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, Decimal]] = None,
+        name: Optional[str] = None,
+        latency: float = 0.05,
+        jitter: float = 0.02,
+        failure_rate: float = 0.0,
+        skew: float = 0.0
+    ):
+        super().__init__(rates, name)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.skew = skew  # relative offset applied to every rate, e.g. 0.1 for +10%
+
+    async def fetch_rate(self, asset: str) -> Decimal:
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.failure_rate:
+            raise RateProviderError("simulated failure")
+        return self.rates[asset] * (1 + Decimal(str(self.skew)))
+
+class ProviderStats:
+    """Moving latency and error statistics for one provider"""
+
+    ALPHA = 0.2  # weight of the newest sample in the moving averages
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.outliers = 0
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+
+    def record(self, latency: float, ok: bool):
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+        self._record_latency(latency)
+        self.error_ewma += self.ALPHA * ((0.0 if ok else 1.0) - self.error_ewma)
+
+    def record_cancelled(self, elapsed: float):
+        """A hedged request that lost the race; elapsed is a lower bound of its latency"""
+        self.cancelled += 1
+        self._record_latency(elapsed)
+
+    def record_outlier(self):
+        """An answer rejected for disagreeing with the other sources counts as an error"""
+        self.outliers += 1
+        self.error_ewma += self.ALPHA * (1.0 - self.error_ewma)
+
+    def _record_latency(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.ALPHA * (latency - self.latency_ewma)
+
+    def score(self) -> float:
+        """Lower is better; untried providers score 0 so they get sampled"""
+        if self.latency_ewma is None:
+            return 0.0
+        # An error costs as much as waiting out a full fetch timeout
+        return self.latency_ewma + self.error_ewma * RATE_FETCH_TIMEOUT
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "outliers": self.outliers,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "error_rate": round(self.error_ewma, 3),
+            "score": round(self.score(), 4),
+        }
+
+class RateAggregator:
+    """Queries several providers with hedging and combines their rates
+
+    The best-ranked providers are queried concurrently. If none answers within
+    hedge_delay, or one fails, the next provider is added. Once quorum rates
+    agree within max_deviation of their median, the remaining requests are
+    cancelled and the median of the agreeing rates is returned.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[RateProvider],
+        quorum: int = RATE_QUORUM,
+        hedge_delay: float = RATE_HEDGE_DELAY,
+        timeout: float = RATE_FETCH_TIMEOUT,
+        max_deviation: float = RATE_MAX_DEVIATION
+    ):
+        if not providers:
+            raise ValueError("At least one rate provider is required")
+        self.providers = list(providers)
+        self.quorum = max(1, min(quorum, len(self.providers)))
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self.max_deviation = Decimal(str(max_deviation))
+        self.stats: Dict[str, ProviderStats] = {p.name: ProviderStats() for p in self.providers}
+        self.outliers_rejected = 0
+
+    def ranked_providers(self) -> List[RateProvider]:
+        """Providers ordered by observed latency and error rate, best first"""
+        # sorted() is stable, so ties keep the configured order
+        return sorted(self.providers, key=lambda p: self.stats[p.name].score())
+
+    async def _query(self, provider: RateProvider, asset: str) -> Decimal:
+        started = time.monotonic()
+        try:
+            rate = await provider.fetch_rate(asset)
+            if rate <= 0:
+                raise RateProviderError(f"{provider.name}: non-positive rate {rate}")
+        except asyncio.CancelledError:
+            self.stats[provider.name].record_cancelled(time.monotonic() - started)
+            raise
+        except Exception:
+            self.stats[provider.name].record(time.monotonic() - started, ok=False)
+            raise
+        self.stats[provider.name].record(time.monotonic() - started, ok=True)
+        return rate
+
+    def _agreeing(self, answers: List[Tuple[str, Decimal]]) -> List[Tuple[str, Decimal]]:
+        """(provider, rate) answers within max_deviation of the median rate"""
+        if len(answers) < 2:
+            return list(answers)
+        mid = median(rate for _, rate in answers)
+        return [(name, rate) for name, rate in answers if abs(rate - mid) <= mid * self.max_deviation]
+
+    async def fetch_rate(self, asset: str) -> Decimal:
+        """Fetch asset/PEN rate from the providers, raising RateProviderError if none answer"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        queue = iter(self.ranked_providers())
+        pending: Dict[asyncio.Task, str] = {}
+        answers: List[Tuple[str, Decimal]] = []
+        errors: List[str] = []
+
+        def launch() -> bool:
+            provider = next(queue, None)
+            if provider is None:
+                return False
+            pending[asyncio.create_task(self._query(provider, asset))] = provider.name
+            return True
+
+        for _ in range(self.quorum):
+            launch()
+
+        try:
+            while pending and len(self._agreeing(answers)) < self.quorum:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, _ = await asyncio.wait(
+                    pending, timeout=min(self.hedge_delay, remaining), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Hedge: nobody answered within the threshold
+                    launch()
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append(f"{name}: {task.exception()}")
+                        launch()
+                    else:
+                        answers.append((name, task.result()))
+                if not pending and len(self._agreeing(answers)) < self.quorum:
+                    # Answers disagree or fell short; ask one more source if any are left
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if not answers:
+            raise RateProviderError(f"No rate for {asset} from any provider: {'; '.join(errors) or 'timed out'}")
+
+        agreeing = self._agreeing(answers)
+        if len(answers) > 2:
+            if not agreeing:
+                # Every rate is an outlier to the others: none can be trusted
+                raise RateProviderError(
+                    f"No {asset} rates agree within {self.max_deviation:%}: "
+                    + ", ".join(f"{name}={rate}" for name, rate in answers)
+                )
+            for name, _ in set(answers) - set(agreeing):
+                self.stats[name].record_outlier()
+                self.outliers_rejected += 1
+        else:
+            # Two disagreeing rates give no way to pick one; use their midpoint
+            agreeing = answers
+        if errors:
+            logger.warning(f"Rate providers failed for {asset}: {'; '.join(errors)}")
+        return median(rate for _, rate in agreeing)
+
+    def provider_stats(self) -> Dict:
+        return {
+            "providers": {name: stats.to_dict() for name, stats in self.stats.items()},
+            "order": [p.name for p in self.ranked_providers()],
+            "outliers_rejected": self.outliers_rejected,
+        }
+
+PROVIDER_CLASSES = {
+    "coingecko": CoinGeckoProvider,
+    "cryptocompare": CryptoCompareProvider,
+    "coinbase": CoinbaseProvider,
+    "static": StaticRateProvider,
+    "simulated": SimulatedRateProvider,
+}
+
+def build_providers(names: Iterable[str]) -> List[RateProvider]:
+    """Instantiate providers from their configured names"""
+    providers = []
+    for name in names:
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in PROVIDER_CLASSES:
+            raise ValueError(f"Unknown exchange rate provider: {name}")
+        providers.append(PROVIDER_CLASSES[name]())
+    return providers
+
+def default_aggregator() -> RateAggregator:
+    """Aggregator over the providers named in EXCHANGE_RATE_PROVIDERS"""
+    return RateAggregator(build_providers(RATE_PROVIDERS.split(",")))
@@ -0,0 +1,136 @@
+from datetime import date, datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import Numeric, cast, delete, func, insert, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import UPSERT_INSERTS
+from ..models.models import Invoice, InvoiceRollup, invoices_archive
+
+# (user_id, created_at, method, amount_pen, old_status, new_status); old_status is None for new invoices
+RollupChange = Tuple[int, datetime, str, float, Optional[str], str]
+
+def to_cents(amount_pen: float) -> int:
+    """Whole cents of an amount, halves rounded away from zero like SQL round()"""
+    return int(Decimal(str(amount_pen)).scaleb(2).quantize(Decimal("1"), ROUND_HALF_UP))
+
+def sql_cents(amount_pen, dialect: str):
+    """SQL expression rounding amount_pen to cents exactly as to_cents() does"""
+    if dialect == "postgresql":
+        # round(numeric) rounds halves away from zero; round(double precision) would round them to even
+        return func.round(cast(amount_pen, Numeric) * 100)
+    # amount_pen * 100 is a double, so 1.005 gives 100.49999999999999; the inner
+    # round() drops that error before halves are rounded
+    return func.round(func.round(amount_pen * 100, 6))
+
+def sql_utc_day(created_at, dialect: str):
+    """SQL expression for the UTC calendar day of created_at, as utc_day() gives it"""
+    if dialect == "postgresql":
+        # date() of a timestamptz follows the session TimeZone
+        return func.date(func.timezone("UTC", created_at))
+    # SQLite stores datetimes without an offset; they are UTC
+    return func.date(created_at)
+
+def utc_day(moment: datetime) -> date:
+    """UTC calendar day of a database datetime; naive values are UTC"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.date()
+
+class RollupService:
+    """Service for the per-day invoice rollups behind /api/stats"""
+
+    @staticmethod
+    async def record(db: AsyncSession, changes: Iterable[RollupChange]):
+        """Apply invoice creations and status transitions to the rollups in db's transaction
+
+        Changes are summed per rollup row first, so a batch costs one upsert.
+        """
+        deltas: Dict[Tuple[int, date, str, str], List[int]] = {}
+        for user_id, created_at, method, amount_pen, old_status, new_status in changes:
+            day, cents = utc_day(created_at), to_cents(amount_pen)
+            if old_status is not None:
+                delta = deltas.setdefault((user_id, day, method, old_status), [0, 0])
+                delta[0] -= 1
+                delta[1] -= cents
+            delta = deltas.setdefault((user_id, day, method, new_status), [0, 0])
+            delta[0] += 1
+            delta[1] += cents
+
+        rows = [
+            {
+                "user_id": user_id,
+                "day": day,
+                "method": method,
+                "status": status,
+                "invoice_count": count,
+                "amount_pen_cents": cents
+            }
+            for (user_id, day, method, status), (count, cents) in deltas.items()
+            if count or cents
+        ]
+        if not rows:
+            return
+
+        stmt = UPSERT_INSERTS[db.get_bind().dialect.name](InvoiceRollup).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[InvoiceRollup.user_id, InvoiceRollup.day, InvoiceRollup.method, InvoiceRollup.status],
+            set_={
+                "invoice_count": InvoiceRollup.invoice_count + stmt.excluded.invoice_count,
+                "amount_pen_cents": InvoiceRollup.amount_pen_cents + stmt.excluded.amount_pen_cents
+            }
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    def rebuild_statements(dialect: str) -> list:
+        """Statements that recompute every rollup row from live and archived invoices
+
+        Days and cents are computed as record() computes them, so a rebuild
+        reproduces the rollups it maintains.
+        """
+        invoices = union_all(*[
+            select(table.c.user_id, table.c.created_at, table.c.method, table.c.status, table.c.amount_pen)
+            for table in (Invoice.__table__, invoices_archive)
+        ]).subquery()
+        day = sql_utc_day(invoices.c.created_at, dialect)
+        return [
+            delete(InvoiceRollup),
+            insert(InvoiceRollup).from_select(
+                ["user_id", "day", "method", "status", "invoice_count", "amount_pen_cents"],
+                select(
+                    invoices.c.user_id, day, invoices.c.method, invoices.c.status,
+                    func.count(), func.sum(sql_cents(invoices.c.amount_pen, dialect))
+                ).group_by(invoices.c.user_id, day, invoices.c.method, invoices.c.status)
+            ),
+        ]
+
+    @staticmethod
+    async def rebuild(db: AsyncSession):
+        """Recompute all rollups from invoices, e.g. to backfill or repair them"""
+        for stmt in RollupService.rebuild_statements(db.get_bind().dialect.name):
+            await db.execute(stmt)
+
+    @staticmethod
+    async def get_stats(
+        db: AsyncSession,
+        user_id: int,
+        since: date,
+        until: date,
+        method: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[InvoiceRollup]:
+        """Rollup rows for user_id with since <= day <= until, oldest day first"""
+        query = select(InvoiceRollup).where(
+            InvoiceRollup.user_id == user_id,
+            InvoiceRollup.day >= since,
+            InvoiceRollup.day <= until,
+            InvoiceRollup.invoice_count != 0
+        )
+        if method:
+            query = query.where(InvoiceRollup.method == method)
+        if status:
+            query = query.where(InvoiceRollup.status == status)
+        query = query.order_by(InvoiceRollup.day, InvoiceRollup.method, InvoiceRollup.status)
+
+        result = await db.execute(query)
+        return result.scalars().all()
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from ..database import AsyncSessionLocal
+from .invoice_service import InvoiceService, StatusEvent
+
+logger = logging.getLogger(__name__)
+
+# Most status events committed in one transaction
+STATUS_BATCH_MAX_SIZE = int(os.getenv("STATUS_BATCH_MAX_SIZE", "500"))
+# Seconds the first event of a batch waits for more before the batch is committed
+STATUS_BATCH_MAX_WAIT = float(os.getenv("STATUS_BATCH_MAX_WAIT", "0.01"))
+# Most events waiting to be written; submit() waits for room beyond this
+STATUS_QUEUE_MAX_SIZE = int(os.getenv("STATUS_QUEUE_MAX_SIZE", "10000"))
+
+class StatusWriter:
+    """Write-behind queue that group-commits status events from the payment listeners
+
+    Events submitted while a batch is being committed go into the next one,
+    so a burst costs one transaction, and one fsync, per batch instead of
+    per event. Each submitter gets a future that resolves once its event is
+    committed: True if it changed the invoice's status, False if it was a
+    repeat or the invoice does not exist.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = STATUS_BATCH_MAX_SIZE,
+        max_wait: float = STATUS_BATCH_MAX_WAIT,
+        max_queued: int = STATUS_QUEUE_MAX_SIZE
+    ):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "asyncio.Queue[Tuple[StatusEvent, asyncio.Future]]" = asyncio.Queue(max_queued)
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_batch_seen = 0
+        self.max_commit_seconds = 0.0
+
+    async def submit(self, event: StatusEvent) -> "asyncio.Future[bool]":
+        """Queue a StatusEvent; returns a future resolved once it is committed"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((event, future))
+        return future
+
+    async def _next_batch(self) -> List[Tuple[StatusEvent, asyncio.Future]]:
+        """Wait for an event, then take more until the batch is full or max_wait has passed"""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _commit(self, batch: List[Tuple[StatusEvent, asyncio.Future]]) -> List[bool]:
+        """Apply and commit the batch's events in one transaction; returns whether each changed a status"""
+        events = [event for event, _ in batch]
+        async with AsyncSessionLocal() as session:
+            changes = await InvoiceService.apply_status_events(session, events)
+            await session.commit()
+
+        # Only the first event per change reports it, so a repeated event does not notify twice
+        unreported: Set[Tuple[str, str]] = set(changes.transitions)
+        changed = []
+        for event in events:
+            key = (event.invoice_id, event.status)
+            changed.append(key in unreported)
+            unreported.discard(key)
+        return changed
+
+    async def _write(self, batch: List[Tuple[StatusEvent, asyncio.Future]]):
+        started = time.monotonic()
+        try:
+            results = await self._commit(batch)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to write {len(batch)} status events: {str(e)}")
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            # Write the events one by one so a bad event only fails its own submitter
+            for item in batch:
+                await self._write([item])
+            return
+
+        self.batches += 1
+        self.written += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        self.max_commit_seconds = max(self.max_commit_seconds, time.monotonic() - started)
+        for (_, future), changed in zip(batch, results):
+            if not future.done():
+                future.set_result(changed)
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            await self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop after writing everything already submitted"""
+        if self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_batch": self.max_batch,
+            "max_wait": self.max_wait,
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+            "average_batch": round(self.written / self.batches, 2) if self.batches else 0.0,
+            "max_batch_seen": self.max_batch_seen,
+            "max_commit_seconds": round(self.max_commit_seconds, 4),
+        }
+
+# Global instance
+status_writer = StatusWriter()
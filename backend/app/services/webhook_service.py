@@ -1,6 +1,6 @@
-import httpx
 from typing import Dict, Any, Optional
 import logging
+from .http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -28,20 +28,19 @@ class WebhookService:
                 ).hexdigest()
                 headers["X-Signature"] = signature
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    webhook_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=10.0
-                )
+            response = await http_clients.get("webhooks").post(
+                webhook_url,
+                json=payload,
+                headers=headers,
+                timeout=10.0
+            )
 
-                if response.status_code in [200, 201, 202]:
-                    logger.info(f"Webhook sent successfully to {webhook_url}")
-                    return True
-                else:
-                    logger.error(f"Webhook failed with status {response.status_code}: {response.text}")
-                    return False
+            if response.status_code in [200, 201, 202]:
+                logger.info(f"Webhook sent successfully to {webhook_url}")
+                return True
+            else:
+                logger.error(f"Webhook failed with status {response.status_code}: {response.text}")
+                return False
 
         except Exception as e:
             logger.error(f"Error sending webhook to {webhook_url}: {str(e)}")
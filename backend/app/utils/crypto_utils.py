@@ -1,7 +1,7 @@
 import os
 import hashlib
 import hmac
-from typing import Dict, Any
+from typing import Dict, Any, List
 import json
 
 def generate_btc_address() -> str:
@@ -22,6 +22,14 @@ def generate_evm_address() -> str:
     # This is a placeholder - in production you'd use a proper wallet
     return "0x742d35Cc6635C0532925a3b8D2F3ED3e9"
 
+def generate_btc_addresses(count: int) -> List[str]:
+    """Generate count BTC addresses at once (placeholder - in production derive a range of HD wallet indexes)"""
+    return [generate_btc_address() for _ in range(count)]
+
+def generate_evm_addresses(count: int) -> List[str]:
+    """Generate count EVM addresses at once (placeholder)"""
+    return [generate_evm_address() for _ in range(count)]
+
 def generate_webhook_signature(payload: Dict[str, Any], secret: str) -> str:
     """Generate HMAC signature for webhook"""
     payload_str = json.dumps(payload, separators=(',', ':'), sort_keys=True)
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# Crockford base32 in lowercase; ASCII order matches numeric order, so IDs sort by time
+ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+DECODE = {char: value for value, char in enumerate(ALPHABET)}
+
+TIME_CHARS = 10  # 48-bit millisecond timestamp
+RANDOM_CHARS = 16  # 80 random bits
+RANDOM_MAX = (1 << 80) - 1
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, remainder = divmod(value, 32)
+        chars.append(ALPHABET[remainder])
+    return "".join(reversed(chars))
+
+class SortableIdGenerator:
+    """ULID-style IDs: a millisecond timestamp followed by random bits
+
+    IDs made in the same millisecond increment the random part instead of
+    drawing a new one, so IDs from one process are strictly increasing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new(self, prefix: str) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            elif self._last_random < RANDOM_MAX:
+                # Same millisecond (or the clock stepped back): stay after the last ID
+                self._last_random += 1
+            else:
+                # 2^80 IDs in one millisecond: borrow the next one
+                self._last_ms += 1
+                self._last_random = 0
+            return f"{prefix}_{_encode(self._last_ms, TIME_CHARS)}{_encode(self._last_random, RANDOM_CHARS)}"
+
+_generator = SortableIdGenerator()
+
+def new_id(prefix: str) -> str:
+    """New time-sortable ID such as inv_01j9z3k6q8t5w2m4x7c9b1n3d5"""
+    return _generator.new(prefix)
+
+def id_timestamp(value: str) -> datetime:
+    """UTC time encoded in an ID made by new_id; raises ValueError for other IDs"""
+    _, _, body = value.rpartition("_")
+    if len(body) != TIME_CHARS + RANDOM_CHARS:
+        raise ValueError(f"Not a sortable ID: {value}")
+    millis = 0
+    for char in body[:TIME_CHARS]:
+        if char not in DECODE:
+            raise ValueError(f"Not a sortable ID: {value}")
+        millis = millis * 32 + DECODE[char]
+    return datetime.fromtimestamp(millis / 1000, tz=timezone.utc)
+
+def id_floor(prefix: str, moment: datetime) -> str:
+    """Smallest ID that new_id could produce at moment
+
+    Every ID made at or after moment compares >= the result, so it works as a
+    range bound for paging or partitioning by time. Naive datetimes are UTC.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    millis = int(moment.timestamp() * 1000)
+    return f"{prefix}_{_encode(millis, TIME_CHARS)}{ALPHABET[0] * RANDOM_CHARS}"
@@ -0,0 +1,31 @@
+import json
+from datetime import date, datetime
+from typing import Any
+from fastapi import Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> bytes:
+    """Encode value as compact JSON bytes; datetimes become ISO 8601 strings
+
+    Uses orjson when installed, which is several times faster than json.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), default=_default).encode()
+
+class JSONBytesResponse(Response):
+    """Response for bodies already encoded with dumps(), skipping response_model validation"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+class TTLOrderedStore(Generic[V]):
+    """Bounded in-memory mapping whose entries expire a fixed TTL after they are stored
+
+    Every entry gets the same TTL, so insertion order is also expiry order:
+    expired entries are always at the front, and purging stops at the first
+    live one. Storing a key again moves it to the back. When full, the oldest
+    entries are evicted first. An entry stored with an earlier expires_at may
+    outlive purging, but get() never returns it.
+    """
+
+    def __init__(self, ttl: float, max_size: Optional[int] = None, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()  # key -> (expires_at, value)
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def purge(self):
+        """Drop the expired entries at the front"""
+        now = self.clock()
+        while self._entries:
+            expires_at, _ = next(iter(self._entries.values()))
+            if expires_at > now:
+                break
+            self._entries.popitem(last=False)
+            self.expired += 1
+
+    def put(self, key: Hashable, value: V, expires_at: Optional[float] = None):
+        """Store value until expires_at, by default ttl from now on the store's clock"""
+        self.purge()
+        self._entries.pop(key, None)
+        while self.max_size is not None and len(self._entries) >= self.max_size:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+        self._entries[key] = (self.clock() + self.ttl if expires_at is None else expires_at, value)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Live value of key, or None"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            return None
+        return entry[1]
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Remove key and return its live value, or None"""
+        value = self.get(key)
+        if value is not None:
+            del self._entries[key]
+        return value
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Payo Backend - Database Engine Benchmark
+
+Measures invoice throughput through InvoiceService for each engine
+configuration: the old engine (SQLite with echo=True, logging to /dev/null
+here, which understates a terminal), SQLite with its default pragmas, SQLite
+with the tuned SQLITE_PRAGMAS from app/database.py, and PostgreSQL via
+asyncpg when --postgres-url is given. Each configuration runs three phases with
+concurrent workers, each operation in its own session and transaction:
+creates, reads by ID, and both at once. Each phase reports its best round.
+
+The PostgreSQL database must be a scratch one: its tables are dropped and
+recreated.
+
+Usage: python benchmark_database.py [--invoices 2000] [--reads 5000] [--workers 16] [--rounds 3]
+                                    [--postgres-url postgresql+asyncpg://...]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import tempfile
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+os.environ.setdefault("EXCHANGE_RATE_PROVIDERS", "static")
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database import SQLITE_PRAGMAS, Base, make_engine
+from app.migrations import run_migrations
+from app.models.models import User
+from app.services.invoice_service import InvoiceService
+
+METHODS = ("BTC", "BTC_LN", "USDC_BASE")
+
+async def run_workers(workers: int, operations: int, operation: Callable[[int], Awaitable[None]]) -> Tuple[float, int]:
+    """Run operations calls spread over workers tasks; returns (successful operations per second, failures)"""
+    counter = iter(range(operations))
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        for i in counter:
+            try:
+                await operation(i)
+            except OperationalError:
+                # "database is locked": what a request would get as a 500
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(workers)])
+    return (operations - failures) / (time.perf_counter() - started), failures
+
+async def benchmark(url: str, sqlite_pragmas, args, echo: bool = False) -> List[Tuple[float, int]]:
+    if echo:
+        # The echo handler binds sys.stdout when the engine is made
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            engine = make_engine(url, echo=True, sqlite_pragmas=sqlite_pragmas)
+    else:
+        engine = make_engine(url, echo=False, sqlite_pragmas=sqlite_pragmas)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await run_migrations(engine)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as session:
+        session.add(User(id=1, email="bench@payo.app", password_hash="x"))
+        await session.commit()
+
+    invoice_ids: List[str] = []
+
+    async def create(i: int):
+        async with Session() as session:
+            invoice = await InvoiceService.create_invoice(
+                session, user_id=1, amount_pen=10.0 + i % 500, method=METHODS[i % len(METHODS)],
+                description=f"Order #{i}"
+            )
+            await session.commit()
+            invoice_ids.append(invoice.id)
+
+    async def read(i: int):
+        async with Session() as session:
+            await InvoiceService.get_invoice(session, random.choice(invoice_ids), columns=InvoiceService.DETAIL_COLUMNS)
+
+    async def mixed(i: int):
+        await (create(i) if i % 4 == 0 else read(i))
+
+    phases = []
+    try:
+        for operation, count in ((create, args.invoices), (read, args.reads), (mixed, args.reads)):
+            # Best of several rounds: runs on a shared machine are noisy
+            rounds = [await run_workers(args.workers, count, operation) for _ in range(args.rounds)]
+            phases.append((max(rate for rate, _ in rounds), sum(failures for _, failures in rounds)))
+    finally:
+        await engine.dispose()
+    return phases
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--postgres-url", default=None)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        configurations = [
+            ("SQLite, echo=True", f"sqlite+aiosqlite:///{directory}/echo.db", {}, True),
+            ("SQLite, default pragmas", f"sqlite+aiosqlite:///{directory}/default.db", {}, False),
+            ("SQLite, SQLITE_PRAGMAS", f"sqlite+aiosqlite:///{directory}/tuned.db", SQLITE_PRAGMAS, False),
+        ]
+        if args.postgres_url:
+            configurations.append(("PostgreSQL, asyncpg pool", args.postgres_url, None, False))
+        for label, url, pragmas, echo in configurations:
+            results.append((label, await benchmark(url, pragmas, args, echo)))
+
+    print(f"🚀 {args.workers} workers, {args.invoices} creates, {args.reads} reads, {args.reads} mixed (1 in 4 a create)\n")
+    print(f"   {'':26} {'creates/s':>10} {'reads/s':>10} {'mixed/s':>10}  failed (database is locked)")
+    for label, phases in results:
+        rates = "".join(f" {rate:10.0f}" for rate, _ in phases)
+        print(f"📊 {label:26}{rates}  {' / '.join(str(failures) for _, failures in phases)}")
+    baseline, tuned = results[0][1], results[2][1]
+    print(
+        f"\n🎯 Tuned SQLite vs the old engine (echo=True, default pragmas): "
+        f"{tuned[0][0] / baseline[0][0]:.1f}x creates, "
+        f"{tuned[1][0] / baseline[1][0]:.1f}x reads, {tuned[2][0] / baseline[2][0]:.1f}x mixed"
+    )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Payo Backend - Invoice Event Fan-out Benchmark
+
+Opens many subscriptions on the in-process invoice event broker, the way SSE
+and WebSocket connections do, and measures memory per subscription and the
+cost of publishing status changes to them, including evicting consumers that
+stopped reading.
+
+Usage: python benchmark_invoice_events.py [--connections 10000] [--invoices-per-connection 1] [--events 10000]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.services.invoice_events import InvoiceEventBroker
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--invoices-per-connection", type=int, default=1)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--queue-size", type=int, default=100)
+    args = parser.parse_args()
+
+    broker = InvoiceEventBroker(max_queued=args.queue_size)
+    invoice_ids = [f"inv_bench_{i:08d}" for i in range(args.connections * args.invoices_per_connection)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    subscriptions = [
+        broker.subscribe(invoice_ids[i * args.invoices_per_connection:(i + 1) * args.invoices_per_connection])
+        for i in range(args.connections)
+    ]
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # Events for random subscribed invoices, drained as they arrive, like live connections
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    for _ in range(args.events):
+        invoice_id = random.choice(invoice_ids)
+        broker.publish(invoice_id, {
+            "type": "invoice.updated", "invoice_id": invoice_id,
+            "status": "detected", "previous_status": "pending", "updated_at": now
+        })
+    publish_seconds = time.perf_counter() - started
+    drained = 0
+    for subscription in subscriptions:
+        while not subscription._queue.empty():
+            subscription._queue.get_nowait()
+            drained += 1
+
+    # One hot invoice watched by every connection, nobody reading: all are evicted
+    hot_id = "inv_bench_hot"
+    for subscription in subscriptions:
+        subscription.add([hot_id])
+    started = time.perf_counter()
+    for i in range(args.queue_size + 1):
+        broker.publish(hot_id, {"type": "invoice.updated", "invoice_id": hot_id, "n": i})
+    fanout_seconds = time.perf_counter() - started
+    fanout_deliveries = args.connections * args.queue_size
+
+    stats = broker.stats()
+    print(f"🚀 {args.connections} connections x {args.invoices_per_connection} invoices, queue size {args.queue_size}\n")
+    print(f"📊 Memory:        {memory / len(subscriptions):8.0f} bytes/connection")
+    print(f"📊 Publish:       {publish_seconds / args.events * 1e6:8.2f} µs/event ({drained} delivered)")
+    print(f"📊 Hot fan-out:   {fanout_seconds / fanout_deliveries * 1e6:8.2f} µs/delivery")
+    print(f"📊 Evicted:       {stats['evicted']:8d} slow connections, {stats['connections']} left")
+    print(f"\n🎯 {args.connections} subscriptions in {memory / 2**20:.1f} MiB")
+
+if __name__ == "__main__":
+    asyncio.run(main())
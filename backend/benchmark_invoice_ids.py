@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Payo Backend - Invoice ID Benchmark
+
+Inserts the same number of invoice keys with random IDs (the old
+inv_<uuid4 hex> scheme) and with time-sortable IDs (app.utils.ids), then
+compares insert throughput and primary-key index size on SQLite.
+
+Usage: python benchmark_invoice_ids.py [--rows 10000000] [--batch 10000] [--cache-mb 64]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from app.utils.ids import new_id
+
+def random_id() -> str:
+    return f"inv_{uuid.uuid4().hex[:12]}"
+
+def sortable_id() -> str:
+    return new_id("inv")
+
+SCHEMES = {"random (uuid4)": random_id, "sortable (ulid)": sortable_id}
+
+def run(name, make_id, rows: int, batch: int, cache_mb: int, directory: str):
+    path = os.path.join(directory, f"{name.split()[0]}.db")
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA cache_size = -{cache_mb * 1024}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("CREATE TABLE invoices (id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, created_at TEXT NOT NULL)")
+
+    created_at = datetime.utcnow().isoformat()
+    started = time.perf_counter()
+    segment_started, segment_rows, last_segment_rate = started, 0, 0.0
+    for done in range(0, rows, batch):
+        count = min(batch, rows - done)
+        with conn:
+            conn.executemany(
+                "INSERT INTO invoices (id, user_id, created_at) VALUES (?, ?, ?)",
+                [(make_id(), 1, created_at) for _ in range(count)]
+            )
+        segment_rows += count
+        # Throughput over the last tenth shows how inserts degrade as the index grows
+        if segment_rows >= max(rows // 10, batch) or done + count == rows:
+            now = time.perf_counter()
+            last_segment_rate = segment_rows / (now - segment_started)
+            segment_started, segment_rows = now, 0
+    elapsed = time.perf_counter() - started
+
+    index_bytes, index_pages, index_unused = conn.execute(
+        "SELECT SUM(pgsize), COUNT(*), SUM(unused) FROM dbstat WHERE name = 'sqlite_autoindex_invoices_1'"
+    ).fetchone()
+    conn.close()
+    return {
+        "rows_per_second": rows / elapsed,
+        "last_tenth_rows_per_second": last_segment_rate,
+        "index_mb": index_bytes / 1024 / 1024,
+        "index_fill": 1 - index_unused / index_bytes,
+        "index_pages": index_pages,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--cache-mb", type=int, default=64, help="SQLite page cache; smaller than the index shows the effect sooner")
+    args = parser.parse_args()
+
+    print(f"🚀 Inserting {args.rows:,} invoice IDs per scheme ({args.cache_mb} MB page cache)\n")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, make_id in SCHEMES.items():
+            result = run(name, make_id, args.rows, args.batch, args.cache_mb, directory)
+            print(f"📊 {name}")
+            print(f"   inserts/s (overall):    {result['rows_per_second']:,.0f}")
+            print(f"   inserts/s (last 10%):   {result['last_tenth_rows_per_second']:,.0f}")
+            print(f"   primary key index:      {result['index_mb']:,.1f} MB in {result['index_pages']:,} pages")
+            print(f"   index page fill:        {result['index_fill']:.0%}\n")
+
+if __name__ == "__main__":
+    main()
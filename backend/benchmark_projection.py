@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Payo Backend - Invoice Listing Projection Benchmark
+
+Compares reading a page of invoices as full Invoice objects (what the listing
+used to load) with reading only the listing's SUMMARY_COLUMNS. Seeds an
+in-memory SQLite database with Lightning invoices, whose payment requests and
+QR payloads are the largest columns, and reports bytes read and Python objects
+allocated per page.
+
+Usage: python benchmark_projection.py [--invoices 5000] [--page 50] [--rounds 200]
+"""
+
+import argparse
+import asyncio
+import os
+import secrets
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ.setdefault("EXCHANGE_RATE_PROVIDERS", "static")
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models.models import Invoice, User
+from app.routers.invoices import SUMMARY_COLUMNS, SUMMARY_FIELDS
+from app.services.invoice_service import InvoiceService
+
+def fake_payment_request(amount_sats: int) -> str:
+    """BOLT11-sized payment request: ~350 bech32 characters"""
+    return f"lnbc{amount_sats}n1p" + secrets.token_hex(172)
+
+def value_bytes(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, datetime):
+        return len(value.isoformat())
+    return 8
+
+def row_bytes(rows, columns) -> int:
+    return sum(value_bytes(getattr(row, column)) for row in rows for column in columns)
+
+async def seed(session_factory, count: int):
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        payment_request = fake_payment_request(1000 + i)
+        rows.append({
+            "id": f"inv_bench_{i:08d}",
+            "user_id": 1,
+            "method": "BTC_LN",
+            "amount_pen": 10.0 + i % 500,
+            "amount_crypto": "0.00025974",
+            "asset": "BTC",
+            "chain": "bitcoin",
+            "address_or_pr": payment_request,
+            "status": "confirmed",
+            "description": f"Order #{i}: " + "2x café americano, 1x croissant de mantequilla, propina incluida. " * 3,
+            "expires_at": now + timedelta(minutes=15),
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now - timedelta(seconds=i),
+            "payment_url": f"https://payo.app/pay/inv_bench_{i:08d}",
+            "qr_data": f"lightning:{payment_request}",
+        })
+    async with session_factory() as session:
+        session.add(User(id=1, email="bench@payo.app", password_hash="x"))
+        await session.flush()
+        await session.execute(insert(Invoice), rows)
+        await session.commit()
+
+async def measure(session_factory, page: int, rounds: int, load, names):
+    """Mean seconds, bytes read and allocated blocks for one listing page"""
+    async with session_factory() as session:
+        rows = await load(session)
+        page_bytes = row_bytes(rows, names)
+        del rows
+        session.expunge_all()
+
+        # Blocks still alive once the page is loaded: what a handler holds while encoding it
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        rows = await load(session)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+        del rows
+        session.expunge_all()
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await load(session)
+            session.expunge_all()
+        seconds = (time.perf_counter() - started) / rounds
+    return seconds, page_bytes, blocks
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=5000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory, args.invoices)
+
+    async def full_objects(session):
+        # What the listing loaded before: every column of every Invoice
+        result = await session.execute(
+            select(Invoice).where(Invoice.user_id == 1)
+            .order_by(Invoice.created_at.desc(), Invoice.id.desc()).limit(args.page)
+        )
+        return result.scalars().all()
+
+    async def deferred_objects(session):
+        return await InvoiceService.list_invoices(session, user_id=1, limit=args.page)
+
+    async def summary_rows(session):
+        return await InvoiceService.list_invoices(
+            session, user_id=1, limit=args.page, columns=SUMMARY_COLUMNS
+        )
+
+    all_names = [column.key for column in Invoice.__table__.columns]
+    deferred_names = [name for name in all_names if name not in ("address_or_pr", "description", "qr_data")]
+    summary_names = list(SUMMARY_FIELDS)
+    results = [
+        ("Invoice objects:", await measure(session_factory, args.page, args.rounds, full_objects, all_names)),
+        ("deferred objects:", await measure(session_factory, args.page, args.rounds, deferred_objects, deferred_names)),
+        ("SUMMARY_COLUMNS:", await measure(session_factory, args.page, args.rounds, summary_rows, summary_names)),
+    ]
+    await engine.dispose()
+
+    print(f"🚀 {args.invoices} Lightning invoices, {args.page} per page, {args.rounds} rounds\n")
+    for label, (seconds, page_bytes, blocks) in results:
+        print(
+            f"📊 {label:18} {page_bytes / args.page:7.0f} bytes/row  "
+            f"{blocks / args.page:6.1f} objects/row  {seconds * 1000:6.2f} ms/page"
+        )
+    full, summary = results[0][1], results[-1][1]
+    print(
+        f"\n🎯 Summary rows: {1 - summary[1] / full[1]:.0%} fewer bytes, "
+        f"{1 - summary[2] / full[2]:.0%} fewer objects, "
+        f"{full[0] / summary[0]:.1f}x faster per page"
+    )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Payo Backend - Invoice Serialization Benchmark
+
+Measures per-row cost of turning a page of invoices into a JSON response body:
+the old path (ORM objects -> InvoiceResponse per row -> response_model
+validation -> JSONResponse) against the fast path (column tuples -> dicts ->
+dumps()).
+
+Usage: python benchmark_serialization.py [--rows 500] [--rounds 200]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.models import Invoice
+from app.routers.invoices import INVOICE_FIELDS, InvoiceResponse
+from app.utils.serialization import ORJSON_AVAILABLE, dumps
+
+def make_invoices(count: int) -> List[Invoice]:
+    now = datetime.utcnow()
+    return [
+        Invoice(
+            id=f"inv_01m578h5ta5cz5rsnd40ab{i:04d}",
+            user_id=1,
+            method="BTC",
+            amount_pen=100.0 + i,
+            amount_crypto="0.00025974",
+            asset="BTC",
+            chain="bitcoin",
+            address_or_pr="bc1qxy2kgdygjrsqtzq2n0yrf2493p83kkfjhx0wlh",
+            status="pending",
+            description=f"Order #{i}",
+            expires_at=now + timedelta(minutes=15),
+            created_at=now,
+            updated_at=now,
+            payment_url=f"https://payo.app/pay/inv_{i}",
+            qr_data=f"payo:inv_{i}"
+        )
+        for i in range(count)
+    ]
+
+async def old_path(invoices: List[Invoice], field) -> bytes:
+    """What GET /api/invoices did before: build models, then FastAPI validates and encodes them"""
+    models = [
+        InvoiceResponse(
+            id=invoice.id,
+            amount_pen=invoice.amount_pen,
+            amount_crypto=invoice.amount_crypto,
+            asset=invoice.asset,
+            chain=invoice.chain,
+            method=invoice.method,
+            address_or_pr=invoice.address_or_pr,
+            status=invoice.status,
+            description=invoice.description,
+            expires_at=invoice.expires_at.isoformat(),
+            created_at=invoice.created_at.isoformat(),
+            updated_at=invoice.updated_at.isoformat(),
+            payment_url=invoice.payment_url,
+            qr_data=invoice.qr_data
+        )
+        for invoice in invoices
+    ]
+    content = await serialize_response(field=field, response_content=models)
+    return JSONResponse(content).body
+
+def fast_path(rows: List[tuple]) -> bytes:
+    return dumps([dict(zip(INVOICE_FIELDS, row)) for row in rows])
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    invoices = make_invoices(args.rows)
+    rows = [tuple(getattr(invoice, field) for field in INVOICE_FIELDS) for invoice in invoices]
+    field = create_response_field(name="response", type_=List[InvoiceResponse])
+
+    old_body, new_body = await old_path(invoices, field), fast_path(rows)
+    assert json.loads(old_body) == json.loads(new_body), "fast path output differs"
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        await old_path(invoices, field)
+    old_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        fast_path(rows)
+    new_seconds = time.perf_counter() - started
+
+    per_row = 1_000_000 / (args.rows * args.rounds)
+    print(f"🚀 {args.rows} rows x {args.rounds} rounds (encoder: {'orjson' if ORJSON_AVAILABLE else 'json'})\n")
+    print(f"📊 pydantic + response_model:  {old_seconds * per_row:8.2f} µs/row")
+    print(f"📊 tuples + dumps():           {new_seconds * per_row:8.2f} µs/row")
+    print(f"\n🎯 {old_seconds / new_seconds:.1f}x faster, identical JSON")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Payo Backend - Status Group Commit Benchmark
+
+Replays a burst of payment detections from concurrent listeners against a
+scratch SQLite database, first committing each event in its own transaction
+(the listeners' old behaviour) and then through the StatusWriter group commit,
+and reports events per second, commits and latency until each event is durable.
+
+Usage: python benchmark_status_writer.py [--invoices 2000] [--listeners 16] [--max-batch 500] [--max-wait 0.01]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List, Tuple
+
+os.environ.setdefault("EXCHANGE_RATE_PROVIDERS", "static")
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, make_engine
+from app.migrations import run_migrations
+from app.models.models import User
+from app.services import status_writer as status_writer_module
+from app.services.invoice_service import InvoiceService, StatusEvent
+from app.services.status_writer import StatusWriter
+
+async def setup(url: str, invoices: int):
+    engine = make_engine(url, echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await run_migrations(engine)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as session:
+        session.add(User(id=1, email="bench@payo.app", password_hash="x"))
+        invoice_ids = [
+            (await InvoiceService.create_invoice(session, user_id=1, amount_pen=10.0, method="BTC")).id
+            for _ in range(invoices)
+        ]
+        await session.commit()
+    return engine, Session, invoice_ids
+
+async def run_listeners(listeners: int, events: List[StatusEvent], handle) -> Tuple[List[float], int]:
+    """Feed events to handle() from concurrent listeners; returns (seconds until each was durable, failures)"""
+    pending = iter(events)
+    latencies: List[float] = []
+    failures = 0
+
+    async def listener():
+        nonlocal failures
+        for event in pending:
+            started = time.perf_counter()
+            try:
+                await handle(event)
+            except OperationalError:
+                # "database is locked": the payment would have been lost
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*[listener() for _ in range(listeners)])
+    return latencies, failures
+
+def report(label: str, seconds: float, commits: int, latencies: List[float], failures: int) -> float:
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000
+    print(
+        f"📊 {label:16} {len(latencies) / seconds:8.0f} events/s  {commits:6d} commits  "
+        f"p50 {statistics.median(latencies) * 1000:7.2f} ms  p99 {p99:7.2f} ms  {failures} failed"
+    )
+    return len(latencies) / seconds
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--listeners", type=int, default=16)
+    parser.add_argument("--max-batch", type=int, default=500)
+    parser.add_argument("--max-wait", type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(f"🚀 {args.invoices} payments detected by {args.listeners} concurrent listeners\n")
+    with tempfile.TemporaryDirectory() as directory:
+        # Per event: one session and one commit each, as the listeners used to
+        engine, Session, invoice_ids = await setup(f"sqlite+aiosqlite:///{directory}/single.db", args.invoices)
+
+        async def commit_each(event: StatusEvent):
+            async with Session() as session:
+                await InvoiceService.apply_status_events(session, [event])
+                await session.commit()
+
+        events = [StatusEvent(invoice_id, "detected", "tx", "1") for invoice_id in invoice_ids]
+        started = time.perf_counter()
+        latencies, failures = await run_listeners(args.listeners, events, commit_each)
+        single = report("Commit per event", time.perf_counter() - started, len(latencies), latencies, failures)
+        await engine.dispose()
+
+        # Group commit: the writer opens its sessions from the module's session factory
+        engine, Session, invoice_ids = await setup(f"sqlite+aiosqlite:///{directory}/grouped.db", args.invoices)
+        status_writer_module.AsyncSessionLocal = Session
+        writer = StatusWriter(max_batch=args.max_batch, max_wait=args.max_wait)
+        writer.start()
+
+        async def group_commit(event: StatusEvent):
+            await (await writer.submit(event))
+
+        events = [StatusEvent(invoice_id, "detected", "tx", "1") for invoice_id in invoice_ids]
+        started = time.perf_counter()
+        latencies, failures = await run_listeners(args.listeners, events, group_commit)
+        seconds = time.perf_counter() - started
+        await writer.stop()
+        stats = writer.stats()
+        grouped = report("Group commit", seconds, stats["batches"], latencies, failures)
+        await engine.dispose()
+
+    print(f"\n🎯 {grouped / single:.1f}x events/s, {stats['average_batch']} events per commit on average")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Payo Backend - Query Plan Check
+
+Runs the hot invoice and payment queries against a seeded SQLite database and
+fails if any of them needs a full table scan or a temporary sort. The test
+suite runs the same check (tests/test_query_plans.py); this prints the plans.
+
+Usage: python check_query_plans.py
+"""
+
+import asyncio
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import List, NamedTuple
+
+# Price invoices without network access
+os.environ.setdefault("EXCHANGE_RATE_PROVIDERS", "static")
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.migrations import run_migrations
+from app.models.models import Invoice, Payment
+from app.services.archive_service import ArchiveService
+from app.services.invoice_service import InvoiceService, encode_cursor
+
+# Scanning the partial index of pending invoices is fine: it only holds live invoices
+ALLOWED_SCANS = re.compile(r"USING (COVERING )?INDEX ix_invoices_pending_expires_at\b")
+BAD_PLAN = re.compile(r"^SCAN (invoices|payments|invoices_archive|payments_archive)\b|USE TEMP B-TREE")
+
+async def seed(session: AsyncSession):
+    methods = ["BTC", "BTC_LN", "USDC_BASE"]
+    for batch in range(5):
+        rows = await InvoiceService.create_invoices(
+            session, user_id=1 + batch % 2,
+            items=[(10 + i, methods[i % 3], None) for i in range(400)]
+        )
+    # Like production, most invoices are settled; a few pending ones are already past expiry
+    await session.execute(update(Invoice).where(Invoice.amount_pen > 50).values(status="confirmed"))
+    await session.execute(
+        update(Invoice).where(Invoice.amount_pen < 20).values(expires_at=datetime.utcnow() - timedelta(minutes=1))
+    )
+    await session.commit()
+    return rows[-1]["id"]
+
+async def run_hot_queries(session: AsyncSession, invoice_id: str):
+    """Exercise the same code paths the API and listeners use"""
+    invoice = await InvoiceService.get_invoice(session, invoice_id)
+    await InvoiceService.list_invoices(session, user_id=1)
+    await InvoiceService.list_invoices(session, user_id=1, status="pending")
+    await InvoiceService.list_invoices(session, user_id=1, method="BTC")
+    await InvoiceService.list_invoices(session, user_id=1, status="pending", method="BTC_LN")
+    await InvoiceService.list_invoices(
+        session, user_id=1, status="pending", cursor=encode_cursor(invoice.created_at, invoice.id)
+    )
+    async for _ in InvoiceService.stream_export(session, user_id=1, status="confirmed"):
+        break
+    await InvoiceService.list_pending_invoices(session)
+    await InvoiceService.check_expired_invoices(session)
+    await InvoiceService.expire_invoices(session, [invoice_id])
+    await InvoiceService.update_invoice_status(
+        session, invoice_id, "detected", tx_hash="tx_check", amount_received="0.1"
+    )
+    await session.execute(select(Payment).where(Payment.invoice_id == invoice_id))
+    await ArchiveService.get_archived_invoice(session, invoice_id)
+    await ArchiveService.archive_batch(session, cutoff=datetime.utcnow() - timedelta(days=90))
+    await session.rollback()
+
+class QueryPlan(NamedTuple):
+    statement: str
+    details: List[str]  # EXPLAIN QUERY PLAN rows
+    bad: List[str]  # details that scan a hot table or sort in a temporary B-tree
+
+async def hot_query_plans() -> List[QueryPlan]:
+    """Plans of every statement the hot queries run against a seeded, analyzed database"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await run_migrations(engine)
+    Session = sessionmaker(engine, class_=AsyncSession)
+
+    async with Session() as session:
+        invoice_id = await seed(session)
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("ANALYZE")
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    async with Session() as session:
+        await run_hot_queries(session, invoice_id)
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            details = [row[-1] for row in plan]
+            bad = [d for d in details if BAD_PLAN.search(d) and not ALLOWED_SCANS.search(d)]
+            plans.append(QueryPlan(statement, details, bad))
+    await engine.dispose()
+    return plans
+
+async def main() -> int:
+    plans = await hot_query_plans()
+    for plan in plans:
+        status = "❌" if plan.bad else "✅"
+        print(f"{status} {' '.join(plan.statement.split())[:110]}")
+        for detail in plan.details:
+            print(f"     {detail}")
+
+    failures = sum(1 for plan in plans if plan.bad)
+    print(f"\n🎯 {len(plans) - failures}/{len(plans)} hot queries use an index")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1 @@
+# Makes pytest put backend/ on sys.path, so tests import the app package as "app"
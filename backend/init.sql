@@ -9,10 +9,8 @@
 -- You can add any additional database initialization here
 -- such as creating indexes, triggers, or seed data
 
--- Example: Create an index for faster invoice lookups
--- CREATE INDEX IF NOT EXISTS idx_invoices_status ON invoices(status);
--- CREATE INDEX IF NOT EXISTS idx_invoices_method ON invoices(method);
--- CREATE INDEX IF NOT EXISTS idx_invoices_created_at ON invoices(created_at);
+-- Indexes and schema changes are managed by versioned migrations in
+-- app/migrations.py, applied at startup; see check_query_plans.py
 
 -- Example: Create a function for invoice expiry
 -- CREATE OR REPLACE FUNCTION check_invoice_expiry()
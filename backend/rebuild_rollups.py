@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Payo Backend - Rebuild Invoice Rollups
+
+Recomputes the invoice_rollups table behind /api/stats from the invoices
+table in one transaction. Use it to backfill after importing invoices or to
+repair rollups after manual edits.
+
+Usage: python rebuild_rollups.py
+"""
+
+import asyncio
+from sqlalchemy import func, select
+from app.database import AsyncSessionLocal, Base, engine
+from app.migrations import run_migrations
+from app.models.models import InvoiceRollup
+from app.services.rollup_service import RollupService
+
+async def main():
+    # Same schema setup as app startup, so this also works before the app has run
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await run_migrations(engine)
+
+    async with AsyncSessionLocal() as session:
+        await RollupService.rebuild(session)
+        await session.commit()
+        rows, invoices = (await session.execute(
+            select(func.count(), func.coalesce(func.sum(InvoiceRollup.invoice_count), 0))
+        )).one()
+    await engine.dispose()
+
+    print(f"✅ Rebuilt {rows} rollup rows covering {invoices} invoices")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+# Fixed rates, so no test reaches the real exchange rate providers
+os.environ.setdefault("EXCHANGE_RATE_PROVIDERS", "static")
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, make_engine
+from app.models.models import Invoice, User
+
+@pytest.fixture
+def loop():
+    """Event loop the test and its database share; run coroutines with loop.run_until_complete"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture
+def Session(loop):
+    """Session factory for a fresh in-memory database holding the schema and user 1"""
+    engine = make_engine("sqlite+aiosqlite:///:memory:", echo=False, sqlite_pragmas={})
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with Session() as session:
+            session.add(User(id=1, email="tests@payo.app", password_hash="x"))
+            await session.commit()
+
+    loop.run_until_complete(setup())
+    yield Session
+    loop.run_until_complete(engine.dispose())
+
+@pytest.fixture
+def make_invoice():
+    """Build a pending BTC invoice of user 1; keyword arguments override its columns"""
+    def make(invoice_id: str, **columns) -> Invoice:
+        now = datetime.utcnow()
+        values = dict(
+            id=invoice_id, user_id=1, method="BTC", amount_pen=100.0, amount_crypto="0.00026", asset="BTC",
+            chain="bitcoin", address_or_pr="bc1q", status="pending", expires_at=now + timedelta(hours=1),
+            payment_url="x", qr_data="x", created_at=now
+        )
+        values.update(columns)
+        return Invoice(**values)
+    return make
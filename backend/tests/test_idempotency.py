@@ -0,0 +1,40 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.models.models import IdempotencyKey
+from app.services.idempotency import IdempotencyStore, request_fingerprint
+
+class RowSession:
+    """Stands in for an AsyncSession holding one idempotency_keys row"""
+
+    def __init__(self, row: IdempotencyKey):
+        self.row = row
+
+    async def get(self, model, key):
+        return self.row if key == self.row.key else None
+
+def stored_row(expires_at: datetime) -> IdempotencyKey:
+    return IdempotencyKey(
+        key="1:retry", fingerprint=request_fingerprint(b"{}"), status_code=200, body=b'{"invoice_id":"inv_1"}',
+        created_at=expires_at - timedelta(days=1), expires_at=expires_at
+    )
+
+def test_load_timezone_aware_row():
+    # asyncpg returns timestamptz columns as aware datetimes, here not in UTC
+    lima = timezone(timedelta(hours=-5))
+    row = stored_row((datetime.now(timezone.utc) + timedelta(hours=1)).astimezone(lima))
+    store = IdempotencyStore(use_db=True)
+    response = asyncio.run(store._load(RowSession(row), "1:retry"))
+    assert response is not None
+    assert response.body == row.body
+    assert 3500 < response.expires_at - datetime.now(timezone.utc).timestamp() <= 3600
+
+def test_load_expired_rows():
+    store = IdempotencyStore(use_db=True)
+    for expires_at in (datetime.now(timezone.utc) - timedelta(seconds=1), datetime.utcnow() - timedelta(seconds=1)):
+        assert asyncio.run(store._load(RowSession(stored_row(expires_at)), "1:retry")) is None
+
+def test_load_naive_row():
+    # SQLite returns naive UTC datetimes
+    row = stored_row(datetime.utcnow() + timedelta(hours=1))
+    assert asyncio.run(IdempotencyStore(use_db=True)._load(RowSession(row), "1:retry")) is not None
@@ -0,0 +1,24 @@
+from app.services.invoice_cache import InvoiceCache
+
+def test_invalidation_skips_only_overlapping_loads_of_the_same_invoice():
+    cache = InvoiceCache(ttl=60, max_size=10)
+    token = cache.token()
+    cache.invalidate(["inv_other"])
+    cache.put("inv_1", b"{}", '"1"', token)
+    assert cache.get("inv_1") == (b"{}", '"1"')
+
+    token = cache.token()
+    cache.invalidate(["inv_1"])
+    cache.put("inv_1", b"{}", '"2"', token)
+    assert cache.get("inv_1") is None
+
+    cache.put("inv_1", b"{}", '"3"', cache.token())
+    assert cache.get("inv_1") == (b"{}", '"3"')
+
+def test_loads_older_than_the_remembered_invalidations_are_not_cached():
+    cache = InvoiceCache(ttl=60, max_size=2)
+    token = cache.token()
+    cache.invalidate(["inv_1"])
+    cache.invalidate(["inv_2", "inv_3"])
+    cache.put("inv_1", b"{}", '"1"', token)
+    assert cache.get("inv_1") is None
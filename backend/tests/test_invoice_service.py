@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.models.models import Invoice, Payment
+from app.services.invoice_service import InvoiceService, StatusEvent, is_overdue
+
+async def apply_each(Session, events):
+    """Apply each event in its own transaction; returns the StatusChanges of each"""
+    results = []
+    for event in events:
+        async with Session() as session:
+            results.append(await InvoiceService.apply_status_events(session, [event]))
+            await session.commit()
+    return results
+
+async def payment_after(Session, make_invoice, *events: StatusEvent) -> Payment:
+    """The payment row left by applying each event to a new invoice"""
+    async with Session() as session:
+        session.add(make_invoice("inv_1"))
+        await session.commit()
+    await apply_each(Session, events)
+    async with Session() as session:
+        return (await session.execute(select(Payment))).scalar_one()
+
+def test_repeated_events_change_nothing(loop, Session, make_invoice):
+    async def run():
+        async with Session() as session:
+            session.add(make_invoice("inv_1"))
+            await session.commit()
+        event = StatusEvent("inv_1", "detected", "tx_1", "0.00026", 0)
+        first, repeat = await apply_each(Session, [event, event])
+        async with Session() as session:
+            payments = await session.scalar(select(func.count()).select_from(Payment))
+            status = await session.scalar(select(Invoice.status).where(Invoice.id == "inv_1"))
+        return first, repeat, payments, status
+
+    first, repeat, payments, status = loop.run_until_complete(run())
+    assert first.changed == ["inv_1"] and first.transitions == [("inv_1", "detected")]
+    assert repeat.changed == [] and repeat.transitions == []
+    assert payments == 1
+    assert status == "detected"
+
+def test_final_status_is_never_left(loop, Session, make_invoice):
+    async def run():
+        async with Session() as session:
+            session.add(make_invoice("inv_1", status="confirmed"))
+            await session.commit()
+        changes, = await apply_each(Session, [StatusEvent("inv_1", "expired")])
+        async with Session() as session:
+            return changes, await session.scalar(select(Invoice.status).where(Invoice.id == "inv_1"))
+
+    changes, status = loop.run_until_complete(run())
+    assert changes.changed == []
+    assert status == "confirmed"
+
+def test_unknown_invoices_are_reported_missing(loop, Session):
+    changes, = loop.run_until_complete(apply_each(Session, [StatusEvent("inv_missing", "detected", "tx_1", "1")]))
+    assert changes.missing == ["inv_missing"]
+
+def test_confirmation_never_lowers_confirmations(loop, Session, make_invoice):
+    payment = loop.run_until_complete(payment_after(
+        Session, make_invoice,
+        StatusEvent("inv_1", "detected", "tx_1", "0.00026", 3),
+        StatusEvent("inv_1", "confirmed", "tx_1", "0.00026", 1),
+    ))
+    assert payment.confirmed_at is not None
+    assert payment.confirmations == 3
+
+def test_more_confirmations_are_recorded(loop, Session, make_invoice):
+    payment = loop.run_until_complete(payment_after(
+        Session, make_invoice,
+        StatusEvent("inv_1", "confirmed", "tx_1", "0.00026", 1),
+        StatusEvent("inv_1", "confirmed", "tx_1", "0.00026", 6),
+    ))
+    assert payment.confirmations == 6
+
+def test_unknown_methods_are_rejected_by_both_create_paths(loop, Session):
+    async def run():
+        errors = []
+        async with Session() as session:
+            for create in (
+                InvoiceService.create_invoice(session, user_id=1, amount_pen=10.0, method="ETH"),
+                InvoiceService.create_invoices(session, user_id=1, items=[(10.0, "ETH", None)]),
+            ):
+                try:
+                    await create
+                except ValueError as e:
+                    errors.append(str(e))
+        return errors
+
+    assert loop.run_until_complete(run()) == ["Unsupported method: ETH"] * 2
+
+def test_create_invoice_takes_asset_and_chain_from_the_method_tables(loop, Session):
+    async def run():
+        async with Session() as session:
+            return [
+                (invoice.asset, invoice.chain)
+                for invoice in [
+                    await InvoiceService.create_invoice(session, user_id=1, amount_pen=10.0, method=method)
+                    for method in ("BTC", "BTC_LN", "USDC_BASE")
+                ]
+            ]
+
+    assert loop.run_until_complete(run()) == [("BTC", "bitcoin"), ("BTC", "bitcoin"), ("USDC", "base")]
+
+def test_invoices_are_overdue_from_their_expiry(loop, Session, make_invoice):
+    async def run():
+        moment = datetime(2026, 1, 1, 12)
+        async with Session() as session:
+            session.add(make_invoice("inv_early", expires_at=moment - timedelta(seconds=1)))
+            session.add(make_invoice("inv_exact", expires_at=moment))
+            session.add(make_invoice("inv_late", expires_at=moment + timedelta(seconds=1)))
+            session.add(make_invoice("inv_paid", expires_at=moment, status="confirmed"))
+            await session.commit()
+            return (await session.scalars(select(Invoice.id).where(is_overdue(moment)).order_by(Invoice.id))).all()
+
+    assert loop.run_until_complete(run()) == ["inv_early", "inv_exact"]
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.database import get_db, get_read_db
+from app.main import app
+from app.routers.invoices import MAX_LIST_LIMIT
+from app.services.invoice_cache import invoice_cache
+
+@pytest.fixture
+def get(loop, Session, make_invoice):
+    """GET against the API, with the database dependencies on the test database holding two invoices"""
+    async def seed():
+        async with Session() as session:
+            session.add_all([make_invoice("inv_1"), make_invoice("inv_2")])
+            await session.commit()
+
+    async def session():
+        async with Session() as session:
+            yield session
+
+    loop.run_until_complete(seed())
+    # Views cached by earlier tests are of invoices with the same IDs in other databases
+    invoice_cache.clear()
+    app.dependency_overrides = {get_db: session, get_read_db: session}
+
+    def get(url: str, **kwargs):
+        async def request():
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                return await client.get(url, **kwargs)
+        return loop.run_until_complete(request())
+
+    yield get
+    app.dependency_overrides = {}
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=-1", f"limit={MAX_LIST_LIMIT + 1}", "offset=-1"])
+def test_list_rejects_out_of_range_paging(get, query):
+    assert get(f"/api/invoices?{query}").status_code == 422
+
+def test_list_pages_with_cursor(get):
+    first = get("/api/invoices?limit=1")
+    assert first.status_code == 200 and len(first.json()) == 1
+    second = get(f"/api/invoices?limit=1&cursor={first.headers['X-Next-Cursor']}")
+    assert [row["id"] for row in first.json() + second.json()] == ["inv_2", "inv_1"]
+
+def test_list_past_the_end_has_no_cursor(get):
+    response = get("/api/invoices?offset=5")
+    assert response.status_code == 200 and response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+def test_wait_without_validator_returns_at_once(get):
+    started = time.monotonic()
+    response = get("/api/invoices/inv_1?wait=5")
+    assert response.status_code == 200 and response.json()["id"] == "inv_1"
+    assert time.monotonic() - started < 1
+
+def test_wait_with_matching_validator_parks_until_timeout(get):
+    etag = get("/api/invoices/inv_1").headers["ETag"]
+    started = time.monotonic()
+    response = get("/api/invoices/inv_1?wait=1", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and time.monotonic() - started >= 1
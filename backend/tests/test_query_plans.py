@@ -0,0 +1,9 @@
+import asyncio
+
+from check_query_plans import hot_query_plans
+
+def test_hot_queries_use_indexes():
+    plans = asyncio.run(hot_query_plans())
+    # Listings, export, expiry, status updates, payment lookups and archival
+    assert len(plans) >= 16
+    assert [(plan.statement, plan.bad) for plan in plans if plan.bad] == []
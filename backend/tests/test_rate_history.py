@@ -0,0 +1,7 @@
+from app.services.exchange_rate import RATE_REFRESH_INTERVAL, rate_history
+from app.services.rate_history import RATE_HISTORY_DAYS, RateHistory
+
+def test_capacity_holds_the_history_at_the_sample_interval():
+    assert RateHistory(sample_interval=60, path=None).capacity == RATE_HISTORY_DAYS * 1440
+    assert RateHistory(sample_interval=60, capacity=10, path=None).capacity == 10
+    assert rate_history.capacity == RateHistory(sample_interval=RATE_REFRESH_INTERVAL, path=None).capacity
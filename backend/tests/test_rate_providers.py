@@ -0,0 +1,22 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from app.services.rate_providers import RateAggregator, RateProviderError, StaticRateProvider
+
+def aggregator(*rates: str, **kwargs) -> RateAggregator:
+    return RateAggregator(
+        [StaticRateProvider({"BTC": Decimal(rate)}, name=f"p{i}") for i, rate in enumerate(rates)],
+        **kwargs
+    )
+
+def test_median_of_agreeing_rates():
+    rates = aggregator("100", "101", "130", quorum=3)
+    assert asyncio.run(rates.fetch_rate("BTC")) == Decimal("100.5")
+    assert rates.outliers_rejected == 1
+
+def test_no_agreeing_rates_is_a_provider_error():
+    rates = aggregator("100", "110", "120", "130", quorum=4)
+    with pytest.raises(RateProviderError):
+        asyncio.run(rates.fetch_rate("BTC"))
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models.models import InvoiceRollup
+from app.services.rollup_service import RollupService, to_cents
+
+# Halves that binary floats store just below or above .5 cents
+AMOUNTS = [0.125, 1.005, 2.675, 0.145, 10.115, 1234.565, 99.99]
+
+def test_to_cents_rounds_halves_away_from_zero():
+    assert to_cents(0.125) == 13
+    assert to_cents(1.005) == 101
+    assert to_cents(2.675) == 268
+    assert to_cents(99.99) == 9999
+
+async def rollups(Session) -> list:
+    async with Session() as session:
+        result = await session.execute(select(InvoiceRollup).order_by(
+            InvoiceRollup.day, InvoiceRollup.method, InvoiceRollup.status
+        ))
+        return [
+            (row.user_id, row.day, row.method, row.status, row.invoice_count, row.amount_pen_cents)
+            for row in result.scalars()
+        ]
+
+async def record(Session, changes):
+    async with Session() as session:
+        await RollupService.record(session, changes)
+        await session.commit()
+
+def test_transitions_move_totals_between_statuses(loop, Session):
+    created_at = datetime(2026, 3, 1, 12)
+    loop.run_until_complete(record(Session, [
+        (1, created_at, "BTC", 10.5, None, "pending"),
+        (1, created_at, "BTC", 2.25, None, "pending"),
+    ]))
+    loop.run_until_complete(record(Session, [(1, created_at, "BTC", 10.5, "pending", "confirmed")]))
+
+    assert loop.run_until_complete(rollups(Session)) == [
+        (1, date(2026, 3, 1), "BTC", "confirmed", 1, 1050),
+        (1, date(2026, 3, 1), "BTC", "pending", 1, 225),
+    ]
+
+def test_get_stats_filters_days_and_drops_empty_rows(loop, Session):
+    day = datetime(2026, 3, 1, 12)
+    loop.run_until_complete(record(Session, [
+        (1, day, "BTC", 1.0, None, "pending"),
+        (1, day + timedelta(days=1), "USDC_BASE", 2.0, None, "pending"),
+    ]))
+    loop.run_until_complete(record(Session, [(1, day, "BTC", 1.0, "pending", "expired")]))
+
+    async def stats():
+        async with Session() as session:
+            return await RollupService.get_stats(session, 1, date(2026, 3, 1), date(2026, 3, 1))
+
+    assert [(row.method, row.status, row.invoice_count) for row in loop.run_until_complete(stats())] == [
+        ("BTC", "expired", 1)
+    ]
+
+def test_rebuild_matches_record(loop, Session, make_invoice):
+    async def run():
+        # Around midnight UTC, so a day computed in another time zone would differ
+        midnight = datetime(2026, 3, 1)
+        async with Session() as session:
+            changes = []
+            for i, amount in enumerate(AMOUNTS):
+                created_at = midnight + timedelta(minutes=30 * (i - len(AMOUNTS) // 2))
+                method = ("BTC", "USDC_BASE")[i % 2]
+                session.add(make_invoice(
+                    f"inv_{i}", method=method, amount_pen=amount, expires_at=created_at, created_at=created_at
+                ))
+                changes.append((1, created_at, method, amount, None, "pending"))
+            await RollupService.record(session, changes)
+            await session.commit()
+        recorded = await rollups(Session)
+
+        async with Session() as session:
+            await RollupService.rebuild(session)
+            await session.commit()
+        return recorded, await rollups(Session)
+
+    recorded, rebuilt = loop.run_until_complete(run())
+    assert len({day for _, day, *_ in recorded}) == 2
+    assert rebuilt == recorded
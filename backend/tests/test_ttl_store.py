@@ -0,0 +1,46 @@
+from app.utils.ttl_store import TTLOrderedStore
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    store = TTLOrderedStore(10, clock=clock)
+    store.put("a", 1)
+    clock.now += 5
+    store.put("b", 2)
+    clock.now += 5
+    assert store.get("a") is None and store.get("b") == 2
+    store.purge()
+    assert len(store) == 1 and store.expired == 1
+
+def test_put_again_moves_key_to_the_back():
+    clock = Clock()
+    store = TTLOrderedStore(10, clock=clock)
+    store.put("a", 1)
+    clock.now += 5
+    store.put("b", 2)
+    clock.now += 1
+    store.put("a", 3)
+    clock.now += 9.5
+    store.purge()
+    assert store.get("a") == 3 and "b" not in store and store.expired == 1
+
+def test_oldest_entries_are_evicted_when_full():
+    store = TTLOrderedStore(10, max_size=2, clock=Clock())
+    for key in "abc":
+        store.put(key, key)
+    assert "a" not in store and store.get("c") == "c" and store.evicted == 1
+
+def test_explicit_expiry_and_pop():
+    clock = Clock()
+    store = TTLOrderedStore(10, clock=clock)
+    store.put("a", 1, expires_at=clock.now + 1)
+    assert store.pop("a") == 1 and store.pop("a") is None
+    store.put("b", 2, expires_at=clock.now + 1)
+    clock.now += 1
+    assert store.get("b") is None and store.pop("b") is None
@@ -21,6 +21,9 @@ export interface Invoice {
   qr_data: string;
 }
 
+// Row of GET /api/invoices: no payment details, description may be shortened
+export type InvoiceSummary = Omit<Invoice, 'address_or_pr' | 'qr_data'>;
+
 export interface Payment {
   id: string;
   invoice_id: string;
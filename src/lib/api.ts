@@ -12,26 +12,52 @@ export const apiConfig = {
   }
 };
 
-// Generic API function
-async function apiRequest<T>(
-  endpoint: string,
-  options: RequestInit = {}
-): Promise<T> {
+// Response of apiRequestWithMeta: `data` is undefined for 304 Not Modified
+export interface ApiResponse<T> {
+  data?: T;
+  status: number;
+  etag?: string;
+}
+
+async function send(endpoint: string, options: RequestInit): Promise<Response> {
   const url = `${API_BASE_URL}${endpoint}`;
 
   const response = await fetch(url, {
+    ...options,
     headers: {
       'Content-Type': 'application/json',
       ...options.headers
-    },
-    ...options
+    }
   });
 
-  if (!response.ok) {
+  // A 304 answers a conditional request; only apiRequestWithMeta sends those
+  if (!response.ok && response.status !== 304) {
     throw new Error(`API Error: ${response.status} ${response.statusText}`);
   }
 
+  return response;
+}
+
+// Generic API function
+async function apiRequest<T>(
+  endpoint: string,
+  options: RequestInit = {}
+): Promise<T> {
+  const response = await send(endpoint, options);
   return response.json();
 }
 
-export { apiRequest };
+// Like apiRequest, but also returns the status and ETag, for conditional requests
+async function apiRequestWithMeta<T>(
+  endpoint: string,
+  options: RequestInit = {}
+): Promise<ApiResponse<T>> {
+  const response = await send(endpoint, options);
+  return {
+    data: response.status === 304 ? undefined : await response.json(),
+    status: response.status,
+    etag: response.headers.get('ETag') ?? undefined
+  };
+}
+
+export { apiRequest, apiRequestWithMeta };
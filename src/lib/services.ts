@@ -1,7 +1,8 @@
-import { apiRequest, apiConfig } from './api';
+import { apiRequest, apiRequestWithMeta, apiConfig } from './api';
 import {
   Invoice,
   InvoiceWithPayment,
+  InvoiceSummary,
   CreateInvoiceRequest,
   CreateInvoiceResponse,
   InvoiceFilters
@@ -22,14 +23,29 @@ export const invoiceService = {
     return apiRequest<InvoiceWithPayment>(`${apiConfig.endpoints.invoices}/${id}`);
   },
 
+  // Long-poll an invoice: resolves when it differs from `etag` or after `wait` seconds.
+  // Without an etag it returns right away. `invoice` is undefined when it has not
+  // changed (HTTP 304).
+  async waitForInvoice(
+    id: string,
+    etag?: string,
+    wait: number = 25
+  ): Promise<{ invoice?: InvoiceWithPayment; etag?: string }> {
+    const response = await apiRequestWithMeta<InvoiceWithPayment>(
+      `${apiConfig.endpoints.invoices}/${id}${etag ? `?wait=${wait}` : ''}`,
+      { headers: etag ? { 'If-None-Match': etag } : {}, cache: 'no-store' }
+    );
+    return { invoice: response.data, etag: response.etag ?? etag };
+  },
+
   // List invoices with optional filters
-  async listInvoices(filters?: InvoiceFilters): Promise<InvoiceWithPayment[]> {
+  async listInvoices(filters?: InvoiceFilters): Promise<InvoiceSummary[]> {
     const queryParams = filters ? new URLSearchParams(Object.entries(filters)).toString() : '';
     const endpoint = queryParams
       ? `${apiConfig.endpoints.invoices}?${queryParams}`
       : apiConfig.endpoints.invoices;
 
-    return apiRequest<InvoiceWithPayment[]>(endpoint);
+    return apiRequest<InvoiceSummary[]>(endpoint);
   },
 
   // Get exchange rates
@@ -1,6 +1,6 @@
 // Payo store hooks for invoice management
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import {
   Invoice,
@@ -43,14 +43,24 @@ export const useInvoices = (filters?: InvoiceFilters) => {
 };
 
 // Hook for invoice polling in payment page
+// Long-polls: each request waits server-side until the status changes, and
+// unchanged invoices come back as 304s, so polls are cheap and updates immediate.
 export const useInvoicePolling = (id: string) => {
   const [isPolling, setIsPolling] = useState(true);
+  const queryClient = useQueryClient();
+  const etag = useRef<string>();
 
   const query = useQuery({
     queryKey: ['invoice', id],
-    queryFn: () => invoiceService.getInvoice(id),
+    queryFn: async () => {
+      const cached = queryClient.getQueryData<InvoiceWithPayment>(['invoice', id]);
+      const update = await invoiceService.waitForInvoice(id, cached ? etag.current : undefined);
+      etag.current = update.etag;
+      return update.invoice ?? cached!;
+    },
     enabled: !!id,
-    refetchInterval: isPolling ? 3000 : false, // Poll every 3 seconds
+    // A long-poll is already in flight most of the time; this only restarts it once it returns
+    refetchInterval: isPolling ? 1000 : false,
   });
 
   useEffect(() => {